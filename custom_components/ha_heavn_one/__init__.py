@@ -17,14 +17,69 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_ADDRESS, Platform
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.typing import ConfigType
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CAPABILITY_SAVE_DELAY,
+    CAPABILITY_STORE_VERSION,
+    CONF_AGGREGATION_WINDOW,
+    CONF_CAPTURE,
+    CONF_CHANNEL_CONTROL,
+    CONF_DAYLIGHT_TARGET,
+    CONF_FILTER_CO2,
+    CONF_FILTER_HUMIDITY,
+    CONF_FILTER_TEMPERATURE,
+    CONF_ON_DEMAND,
+    CONF_PASSIVE_SCANNING,
+    CONF_SPIKE_REJECTION,
+    CONF_TRACING,
+    DEFAULT_AGGREGATION_WINDOW,
+    DEFAULT_CAPTURE,
+    DEFAULT_CHANNEL_CONTROL,
+    DEFAULT_DAYLIGHT_TARGET,
+    DEFAULT_ON_DEMAND,
+    DEFAULT_PASSIVE_SCANNING,
+    DEFAULT_SPIKE_REJECTION,
+    DEFAULT_TRACING,
+    DATA_CAPABILITIES,
+    DATA_CAPABILITY_STORE,
+    DOMAIN,
+)
+from .heavn import HeavnOneDevice, HeavnOneProtocolHandler
+from .heavn.filters import FILTER_NONE
+from .services import async_setup_services
+from .view import async_register_view
 
-from .const import DOMAIN
-from .heavn import HeavnOneDevice
+PLATFORMS: list[Platform] = [
+    Platform.EVENT,
+    Platform.LIGHT,
+    Platform.SENSOR,
+    Platform.SWITCH,
+]
 
-PLATFORMS: list[Platform] = [Platform.SENSOR, Platform.SWITCH] #, Platform.LIGHT]
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
 _LOGGER = logging.getLogger(__name__)
 
+FILTER_OPTIONS = {
+    CONF_FILTER_CO2: HeavnOneProtocolHandler.GET_CO2,
+    CONF_FILTER_HUMIDITY: HeavnOneProtocolHandler.GET_HUMIDITY,
+    CONF_FILTER_TEMPERATURE: HeavnOneProtocolHandler.GET_TEMPERATURE,
+}
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the HEAVN One integration."""
+    store = Store[dict](hass, CAPABILITY_STORE_VERSION, DATA_CAPABILITIES)
+    hass.data[DATA_CAPABILITY_STORE] = store
+    hass.data[DATA_CAPABILITIES] = await store.async_load() or {}
+    async_setup_services(hass)
+    async_register_view(hass)
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up HEAVN One BLE device from a config entry."""
@@ -37,6 +92,17 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         raise ConfigEntryNotReady(f"Could not find HEAVN One device with address {address}")
 
     device = HeavnOneDevice.fromDevice(ble_device)
+    if service_info := bluetooth.async_last_service_info(hass, address.upper(), connectable=True):
+        device.update_from_advertisement(service_info.device, service_info.advertisement)
+    device.timezone = dt_util.get_default_time_zone()
+    _apply_options(device, entry)
+    device.capability_cache = hass.data[DATA_CAPABILITIES]
+    device.capabilities_changed = lambda: hass.data[DATA_CAPABILITY_STORE].async_delay_save(
+        lambda: hass.data[DATA_CAPABILITIES], CAPABILITY_SAVE_DELAY
+    )
+    if entry.options.get(CONF_CAPTURE, DEFAULT_CAPTURE):
+        await device.start_capture(capture_path(hass, address))
+        entry.async_on_unload(device.stop_capture)
     await device.connect(ble_device)
     await device.collect_device_info()
 
@@ -45,16 +111,34 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     def async_update_ble_device(
         service_info: BluetoothServiceInfoBleak, change: BluetoothChange
     ) -> None:
-        """Update the BLEDevice."""
-        _LOGGER.debug("(%s) New BLE device found", service_info.address)
-        #device.set_ble_device(service_info.device, rssi=service_info.advertisement.rssi)
+        """Update the BLEDevice, presence and RSSI."""
+        _LOGGER.debug("(%s) Advertisement, rssi %s", service_info.address, service_info.rssi)
+        device.update_from_advertisement(
+            service_info.device, service_info.advertisement, service_info.connectable
+        )
 
+    @callback
+    def async_unavailable(service_info: BluetoothServiceInfoBleak) -> None:
+        """Stop connection attempts once the lamp is no longer seen."""
+        _LOGGER.debug("(%s) No longer seen", service_info.address)
+        device.presence.mark_absent()
+
+    scanning_mode = (
+        BluetoothScanningMode.PASSIVE
+        if entry.options.get(CONF_PASSIVE_SCANNING, DEFAULT_PASSIVE_SCANNING)
+        else BluetoothScanningMode.ACTIVE
+    )
     entry.async_on_unload(
         async_register_callback(
             hass,
             async_update_ble_device,
             BluetoothCallbackMatcher(address=entry.data[CONF_ADDRESS]),
-            BluetoothScanningMode.ACTIVE,
+            scanning_mode,
+        )
+    )
+    entry.async_on_unload(
+        bluetooth.async_track_unavailable(
+            hass, async_unavailable, entry.data[CONF_ADDRESS], connectable=True
         )
     )
 
@@ -64,13 +148,30 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     entry.async_on_unload(entry.add_update_listener(_async_update_listener))
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
-    entry.async_create_background_task(hass, apply_fetch_data(hass, device, ble_device), ble_device.address)
+    entry.async_create_background_task(hass, device.maintain_connection(), ble_device.address)
 
     return True
 
-async def apply_fetch_data(hass: HomeAssistant, device: HeavnOneDevice, ble_device: any) -> None:
-    await device.connect(ble_device)
-    await device.run()
+def capture_path(hass: HomeAssistant, address: str) -> str:
+    """Return the capture file of a lamp."""
+    return hass.config.path(f"{DOMAIN}_{address.replace(':', '').lower()}.cap")
+
+def _apply_options(device: HeavnOneDevice, entry: ConfigEntry) -> None:
+    """Configure the processing of readings from the entry options."""
+    device.set_aggregation_window(
+        entry.options.get(CONF_AGGREGATION_WINDOW, DEFAULT_AGGREGATION_WINDOW)
+    )
+    spike_rejection = entry.options.get(CONF_SPIKE_REJECTION, DEFAULT_SPIKE_REJECTION)
+    for option, cmdtype in FILTER_OPTIONS.items():
+        device.set_filter(cmdtype, entry.options.get(option, FILTER_NONE), spike_rejection)
+    device.set_channel_control(
+        entry.options.get(CONF_CHANNEL_CONTROL, DEFAULT_CHANNEL_CONTROL)
+    )
+    device.on_demand = entry.options.get(CONF_ON_DEMAND, DEFAULT_ON_DEMAND)
+    device.set_tracing(entry.options.get(CONF_TRACING, DEFAULT_TRACING))
+    device.set_daylight_target(
+        entry.options.get(CONF_DAYLIGHT_TARGET, DEFAULT_DAYLIGHT_TARGET)
+    )
 
 async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Handle options update."""
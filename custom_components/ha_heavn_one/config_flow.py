@@ -12,12 +12,35 @@ from homeassistant.components.bluetooth import (
     BluetoothServiceInfo,
     async_discovered_service_info,
 )
-from homeassistant.config_entries import ConfigFlow
+from homeassistant.config_entries import ConfigEntry, ConfigFlow, OptionsFlow
 from homeassistant.const import CONF_ADDRESS
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 
-from .const import DOMAIN
+from .const import (
+    CONF_AGGREGATION_WINDOW,
+    CONF_CAPTURE,
+    CONF_CHANNEL_CONTROL,
+    CONF_DAYLIGHT_TARGET,
+    CONF_FILTER_CO2,
+    CONF_FILTER_HUMIDITY,
+    CONF_FILTER_TEMPERATURE,
+    CONF_ON_DEMAND,
+    CONF_PASSIVE_SCANNING,
+    CONF_SPIKE_REJECTION,
+    CONF_TRACING,
+    DEFAULT_AGGREGATION_WINDOW,
+    DEFAULT_CAPTURE,
+    DEFAULT_CHANNEL_CONTROL,
+    DEFAULT_DAYLIGHT_TARGET,
+    DEFAULT_ON_DEMAND,
+    DEFAULT_PASSIVE_SCANNING,
+    DEFAULT_SPIKE_REJECTION,
+    DEFAULT_TRACING,
+    DOMAIN,
+)
 from .heavn import HeavnOneBluetoothDeviceData, HeavnOneDevice
+from .heavn.filters import FILTER_NONE, FILTERS
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -46,6 +69,12 @@ class HeavnOneConfigFlow(ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> OptionsFlow:
+        """Return the options flow."""
+        return HeavnOneOptionsFlow()
+
     def __init__(self) -> None:
         """Initialize the config flow."""
         self._discovered_device: Discovery | None = None
@@ -187,3 +216,77 @@ class HeavnOneConfigFlow(ConfigFlow, domain=DOMAIN):
                 },
             ),
         )
+
+
+class HeavnOneOptionsFlow(OptionsFlow):
+    """Handle the options of a HEAVN One lamp."""
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the options."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self.config_entry.options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_AGGREGATION_WINDOW,
+                        default=options.get(
+                            CONF_AGGREGATION_WINDOW, DEFAULT_AGGREGATION_WINDOW
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=3600)),
+                    vol.Required(
+                        CONF_FILTER_TEMPERATURE,
+                        default=options.get(CONF_FILTER_TEMPERATURE, FILTER_NONE),
+                    ): vol.In(FILTERS),
+                    vol.Required(
+                        CONF_FILTER_HUMIDITY,
+                        default=options.get(CONF_FILTER_HUMIDITY, FILTER_NONE),
+                    ): vol.In(FILTERS),
+                    vol.Required(
+                        CONF_FILTER_CO2,
+                        default=options.get(CONF_FILTER_CO2, FILTER_NONE),
+                    ): vol.In(FILTERS),
+                    vol.Required(
+                        CONF_SPIKE_REJECTION,
+                        default=options.get(
+                            CONF_SPIKE_REJECTION, DEFAULT_SPIKE_REJECTION
+                        ),
+                    ): bool,
+                    vol.Required(
+                        CONF_CHANNEL_CONTROL,
+                        default=options.get(
+                            CONF_CHANNEL_CONTROL, DEFAULT_CHANNEL_CONTROL
+                        ),
+                    ): bool,
+                    vol.Required(
+                        CONF_CAPTURE,
+                        default=options.get(CONF_CAPTURE, DEFAULT_CAPTURE),
+                    ): bool,
+                    vol.Required(
+                        CONF_PASSIVE_SCANNING,
+                        default=options.get(
+                            CONF_PASSIVE_SCANNING, DEFAULT_PASSIVE_SCANNING
+                        ),
+                    ): bool,
+                    vol.Required(
+                        CONF_ON_DEMAND,
+                        default=options.get(CONF_ON_DEMAND, DEFAULT_ON_DEMAND),
+                    ): bool,
+                    vol.Required(
+                        CONF_DAYLIGHT_TARGET,
+                        default=options.get(
+                            CONF_DAYLIGHT_TARGET, DEFAULT_DAYLIGHT_TARGET
+                        ),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_TRACING,
+                        default=options.get(CONF_TRACING, DEFAULT_TRACING),
+                    ): bool,
+                }
+            ),
+        )
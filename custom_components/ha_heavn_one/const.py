@@ -1,2 +1,34 @@
 DOMAIN = "ha_heavn_one"
-DEFAULT_SCAN_INTERVAL = 600
\ No newline at end of file
+# capabilities by firmware, shared by all lamps
+DATA_CAPABILITIES = f"{DOMAIN}_capabilities"
+DATA_CAPABILITY_STORE = f"{DOMAIN}_capability_store"
+CAPABILITY_STORE_VERSION = 1
+CAPABILITY_SAVE_DELAY = 10
+DEFAULT_SCAN_INTERVAL = 600
+
+CONF_AGGREGATION_WINDOW = "aggregation_window"
+DEFAULT_AGGREGATION_WINDOW = 0
+
+CONF_FILTER_CO2 = "filter_co2"
+CONF_FILTER_HUMIDITY = "filter_humidity"
+CONF_FILTER_TEMPERATURE = "filter_temperature"
+CONF_SPIKE_REJECTION = "spike_rejection"
+DEFAULT_SPIKE_REJECTION = False
+
+CONF_CHANNEL_CONTROL = "channel_control"
+DEFAULT_CHANNEL_CONTROL = False
+
+CONF_CAPTURE = "capture"
+DEFAULT_CAPTURE = False
+
+CONF_DAYLIGHT_TARGET = "daylight_target"
+DEFAULT_DAYLIGHT_TARGET = 0
+
+CONF_TRACING = "tracing"
+DEFAULT_TRACING = False
+
+CONF_PASSIVE_SCANNING = "passive_scanning"
+DEFAULT_PASSIVE_SCANNING = False
+
+CONF_ON_DEMAND = "on_demand"
+DEFAULT_ON_DEMAND = False
@@ -0,0 +1,35 @@
+"""Diagnostics support for HEAVN One."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import ATTR_LATITUDE, ATTR_LONGITUDE, CONF_ADDRESS
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .heavn import HeavnOneDevice, HeavnOneProtocolHandler
+
+TO_REDACT = {
+    CONF_ADDRESS,
+    ATTR_LATITUDE,
+    ATTR_LONGITUDE,
+    "serial_number",
+    # the same values in the state store, keyed by command type
+    HeavnOneProtocolHandler.GET_LATITUDE,
+    HeavnOneProtocolHandler.GET_LONGITUDE,
+    HeavnOneProtocolHandler.GET_SERIAL_NUMBER,
+}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    device: HeavnOneDevice = hass.data[DOMAIN][entry.entry_id]
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "device": async_redact_data(device.diagnostics(), TO_REDACT),
+    }
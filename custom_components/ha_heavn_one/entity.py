@@ -12,6 +12,9 @@ from .heavn import HeavnOneDevice
 
 _LOGGER = logging.getLogger(__name__)
 
+# Seconds a reported value answers homeassistant.update_entity without a read.
+UPDATE_MAX_AGE = 10
+
 
 class HeavnOneEntity(Entity):
     """Base class for HeavnOne entities."""
@@ -50,7 +53,10 @@ class HeavnOneEntity(Entity):
     async def async_update(self) -> None:
         """Update state, called by HA if there is a poll interval and by the service homeassistant.update_entity."""
         _LOGGER.debug("(%s) Updating entity", self.entry.data[CONF_ADDRESS])
-        await self.device.status_query()
+        command_type = getattr(self.entity_description, "command_type", None)
+        if command_type is not None and self.device.state.readable(command_type):
+            # the answer reaches the entity through its callback
+            await self.device.state.get(command_type, max_age=UPDATE_MAX_AGE)
 
 class HeavnOneSwitchEntity(HeavnOneEntity, SwitchEntity):
     """Base class for HeavnOne Switch Entities."""
@@ -77,11 +83,16 @@ class HeavnOneSwitchEntity(HeavnOneEntity, SwitchEntity):
 
         def async_callback(value: bool | None) -> None:
             """Update the sensor value."""
-            self._attr_native_value = self.entity_description.value_func(value)
+            native = self.entity_description.value_func(value)
+            if native == self._attr_native_value:
+                return
+            self._attr_native_value = native
             self.async_write_ha_state()
 
-        self.entity_description.register_callback_func(self.device)(
-            self.entity_description.command_type, async_callback
+        self.async_on_remove(
+            self.entity_description.register_callback_func(self.device)(
+                self.entity_description.command_type, async_callback
+            )
         )
 
     @property
@@ -90,11 +101,35 @@ class HeavnOneSwitchEntity(HeavnOneEntity, SwitchEntity):
 
     async def async_turn_on(self, **kwargs):
         """Turn the entity on."""
-        if self.entity_description.command_type == self.device.handler.GET_MANUAL_MODE_ENABLED:
-            _LOGGER.debug("(%s) Try to turn (%s) on (via %s)", self.device.address, self.entity_description.command_type, str(self.device.uuid))
-            self.device.queue_send(self.device.handler.reqSetManualMode(True))
+        await self._async_set_state(True)
 
     async def async_turn_off(self, **kwargs):
-        """Turn the entity on."""
-        if self.entity_description.command_type == self.device.handler.GET_MANUAL_MODE_ENABLED:
-            self.device.queue_send(self.device.handler.reqSetManualMode(False))
+        """Turn the entity off."""
+        await self._async_set_state(False)
+
+    async def _async_set_state(self, state: bool) -> None:
+        """Write the setting, show it optimistically and confirm it by reading it back."""
+        description = self.entity_description
+        if description.set_func is None:
+            _LOGGER.warning("(%s) %s is not writable", self.device.address, description.key)
+            return
+
+        _LOGGER.debug("(%s) Try to turn (%s) %s (via %s)", self.device.address, description.command_type, "on" if state else "off", str(self.device.uuid))
+        previous = self._attr_native_value
+        self._attr_native_value = state
+        self.async_write_ha_state()
+
+        dataPoint = await self.device.write_and_confirm(
+            description.set_func(self.device.handler, state),
+            description.get_func(self.device.handler),
+            description.command_type,
+        )
+        if dataPoint is None:
+            _LOGGER.warning("(%s) %s was not confirmed by the lamp, rolling back", self.device.address, description.key)
+            confirmed = previous
+        else:
+            confirmed = description.value_func(dataPoint)
+        # the read-back usually reached the callback already
+        if confirmed != self._attr_native_value:
+            self._attr_native_value = confirmed
+            self.async_write_ha_state()
@@ -0,0 +1,91 @@
+"""Support for the physical buttons of a HEAVN One lamp as events."""
+
+from __future__ import annotations
+
+import logging
+
+from homeassistant import config_entries
+from homeassistant.components.event import (
+    EventDeviceClass,
+    EventEntity,
+    EventEntityDescription,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_ADDRESS
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DOMAIN
+from .entity import HeavnOneEntity
+from .heavn import HeavnOneDevice, HeavnOneProtocolHandler
+from .heavn.handler import HeavnOneData
+
+_LOGGER = logging.getLogger(__name__)
+
+BUTTONS = EventEntityDescription(
+    key="buttons",
+    device_class=EventDeviceClass.BUTTON,
+    event_types=[
+        f"{side}_{state}"
+        for side in HeavnOneProtocolHandler.SIDES
+        for state in ("on", "off")
+    ],
+    name="Buttons",
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: config_entries.ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+
+    device: HeavnOneDevice = hass.data[DOMAIN][entry.entry_id]
+    if not device.capabilities.is_supported(HeavnOneProtocolHandler.GET_TOP_MID_BOT):
+        _LOGGER.info(f"Device {device.address} does not report its buttons")
+        return
+    _LOGGER.info(f"Setup button events for device {device.address}")
+    async_add_entities([HeavnOneButtonEventEntity(device, entry, BUTTONS)])
+
+
+class HeavnOneButtonEventEntity(HeavnOneEntity, EventEntity):
+    """Fire an event whenever a side is switched on the lamp."""
+
+    def __init__(
+        self,
+        device: HeavnOneDevice,
+        entry: ConfigEntry,
+        entity_description: EventEntityDescription,
+    ) -> None:
+        """Initialize the event entity."""
+        super().__init__(
+            device, entry, entity_description, unique_id_suffix=entity_description.key
+        )
+        self._states: tuple[bool, ...] | None = None
+
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to the button states pushed by the lamp."""
+        _LOGGER.debug(
+            "(%s) Setting up %s event entity",
+            self.entry.data[CONF_ADDRESS],
+            self.entity_description.key,
+        )
+
+        @callback
+        def async_callback(value: HeavnOneData) -> None:
+            """Fire an event per side that changed."""
+            states = value.dataValue
+            # the first report after connecting only sets the baseline
+            if self._states is not None:
+                for side, (old, new) in enumerate(zip(self._states, states)):
+                    if old != new:
+                        sideName = HeavnOneProtocolHandler.SIDES[side]
+                        self._trigger_event(f"{sideName}_{'on' if new else 'off'}")
+                        self.async_write_ha_state()
+            self._states = states
+
+        self.async_on_remove(
+            self.device.register_sensor_callback(
+                HeavnOneProtocolHandler.GET_TOP_MID_BOT, async_callback
+            )
+        )
@@ -1,8 +1,27 @@
+"""HEAVN One protocol library.
+
+The protocol handler and the pure helpers can be imported without any BLE
+dependency, bleak is only imported once a device class is used.
+"""
 from __future__ import annotations
 
+from typing import TYPE_CHECKING, Any
+
 from .handler import HeavnOneProtocolHandler
-from .models import HeavnOneBluetoothDeviceData, HeavnOneDevice
+
+if TYPE_CHECKING:
+    from .models import HeavnOneBluetoothDeviceData, HeavnOneDevice
 
 __version__ = "0.0.1"
 
-__all__ = ["HeavnOneBluetoothDeviceData", "HeavnOneDevice", "HeavnOneProtocolHandler"]
\ No newline at end of file
+__all__ = ["HeavnOneBluetoothDeviceData", "HeavnOneDevice", "HeavnOneProtocolHandler"]
+
+_LAZY = {"HeavnOneBluetoothDeviceData", "HeavnOneDevice"}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY:
+        from . import models
+
+        return getattr(models, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
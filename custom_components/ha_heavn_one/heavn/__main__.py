@@ -0,0 +1,159 @@
+"""Command line tool for HEAVN One lamps.
+
+Run from the directory containing the heavn package, e.g.
+
+    python -m heavn decode '$qt021.50'
+    python -m heavn encode reqManualSide 0 80 40
+    python -m heavn scan
+    python -m heavn query AA:BB:CC:DD:EE:FF reqGetMetrics reqName
+    python -m heavn bench
+    python -m heavn replay capture.cap
+
+Only scan and query need bleak.
+"""
+from __future__ import annotations
+
+import argparse
+import ast
+import asyncio
+import logging
+import sys
+import time
+
+from .capture import read_capture, replay_detached
+from .handler import HeavnOneProtocolHandler
+
+SERVICE_UUID = "6e400001-b5a3-f393-e0a9-e50e24dcca9e"
+UART_WRITE_UUID = "6e400002-b5a3-f393-e0a9-e50e24dcca9e"
+UART_READ_UUID = "6e400003-b5a3-f393-e0a9-e50e24dcca9e"
+# a write carries the ATT MTU minus this header
+DEFAULT_MTU = 23
+ATT_HEADER_SIZE = 3
+
+# answers of a metrics cycle, used by the benchmark
+BENCH_FRAMES = [
+    b"$mgg030.46", b"$mga3", b"$mgt023.10", b"$mgp097796", b"$mgh041.20",
+    b"$qt023.10", b"$e1", b"$gA1", b"$C3100", b"$I100.030.095",
+]
+
+
+def _parse_argument(value: str):
+    """Return a literal (int, bool, list, ...) or the string itself."""
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return value
+
+
+def _build_request(handler: HeavnOneProtocolHandler, call: list[str]) -> bytes:
+    """Build a request from a handler method name and its arguments."""
+    name, *args = call
+    if not name.startswith("req") or not hasattr(handler, name):
+        raise SystemExit(f"Unknown request: {name}")
+    return getattr(handler, name)(*map(_parse_argument, args))
+
+
+def cmd_encode(args: argparse.Namespace) -> None:
+    print(_build_request(HeavnOneProtocolHandler(), args.request).decode("ascii"))
+
+
+def cmd_decode(args: argparse.Namespace) -> None:
+    handler = HeavnOneProtocolHandler()
+    for frame in args.frames:
+        print(f"{frame}: {handler.handleResponse(frame.encode('ascii'))!r}")
+
+
+async def cmd_scan(args: argparse.Namespace) -> None:
+    from bleak import BleakScanner
+
+    devices = await BleakScanner.discover(timeout=args.timeout, return_adv=True)
+    for device, advertisement in devices.values():
+        if SERVICE_UUID in advertisement.service_uuids or (device.name or "").startswith("HEAVN"):
+            print(f"{device.address}\t{advertisement.rssi}\t{device.name}")
+
+
+async def cmd_query(args: argparse.Namespace) -> None:
+    from bleak import BleakClient
+
+    handler = HeavnOneProtocolHandler()
+
+    def notify(_: int, data: bytearray) -> None:
+        print(f"{bytes(data).decode('ascii', 'replace')}: {handler.handleResponse(data)!r}")
+
+    async with BleakClient(args.address, timeout=args.timeout) as client:
+        maxWrite = max(client.mtu_size or DEFAULT_MTU, DEFAULT_MTU) - ATT_HEADER_SIZE
+        await client.start_notify(UART_READ_UUID, notify)
+        for request in args.requests:
+            for chunk in handler.splitFrames(_build_request(handler, request.split()), maxWrite):
+                await client.write_gatt_char(UART_WRITE_UUID, chunk, True)
+        await asyncio.sleep(args.wait)
+        await client.stop_notify(UART_READ_UUID)
+
+
+def cmd_bench(args: argparse.Namespace) -> None:
+    handler = HeavnOneProtocolHandler()
+    frames = [bytearray(frame) for frame in BENCH_FRAMES]
+    started = time.perf_counter()
+    for _ in range(args.count):
+        for frame in frames:
+            handler.handleResponse(frame)
+    parsed = args.count * len(frames)
+    elapsed = time.perf_counter() - started
+    print(f"parse: {parsed} frames in {elapsed:.3f}s, {parsed / elapsed:,.0f} frames/s")
+
+    started = time.perf_counter()
+    for _ in range(args.count):
+        handler.reqGetMetrics()
+        handler.reqGetAllChannels()
+        handler.reqManualSide(0, 80, 40)
+    elapsed = time.perf_counter() - started
+    print(f"build: {args.count * 3} requests in {elapsed:.3f}s, {args.count * 3 / elapsed:,.0f} requests/s")
+
+
+async def cmd_replay(args: argparse.Namespace) -> None:
+    result = await replay_detached(read_capture(args.path), args.realtime)
+    print(result)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m heavn", description=__doc__.splitlines()[0])
+    parser.add_argument("-v", "--verbose", action="store_true", help="log parsed values")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    encode = commands.add_parser("encode", help="build a request frame")
+    encode.add_argument("request", nargs="+", help="handler method and arguments, e.g. reqSetManualMode True")
+    encode.set_defaults(func=cmd_encode)
+
+    decode = commands.add_parser("decode", help="parse response frames")
+    decode.add_argument("frames", nargs="+")
+    decode.set_defaults(func=cmd_decode)
+
+    scan = commands.add_parser("scan", help="list lamps in range")
+    scan.add_argument("--timeout", type=float, default=10.0)
+    scan.set_defaults(func=cmd_scan)
+
+    query = commands.add_parser("query", help="send requests to a lamp and print the answers")
+    query.add_argument("address")
+    query.add_argument("requests", nargs="+", help="handler method and arguments, quoted if it has arguments")
+    query.add_argument("--timeout", type=float, default=20.0, help="connection timeout")
+    query.add_argument("--wait", type=float, default=3.0, help="seconds to wait for answers")
+    query.set_defaults(func=cmd_query)
+
+    bench = commands.add_parser("bench", help="measure parser and request throughput")
+    bench.add_argument("--count", type=int, default=10000)
+    bench.set_defaults(func=cmd_bench)
+
+    replayParser = commands.add_parser("replay", help="parse the notifications of a capture file")
+    replayParser.add_argument("path")
+    replayParser.add_argument("--realtime", action="store_true", help="keep the captured timing")
+    replayParser.set_defaults(func=cmd_replay)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+    result = args.func(args)
+    if asyncio.iscoroutine(result):
+        asyncio.run(result)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Downsampling of HEAVN One readings into rolling window aggregates."""
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Iterable
+import time
+
+from .handler import HeavnOneData
+
+# raw samples kept per metric for diagnostics
+RAW_SAMPLES = 64
+
+
+class RollingWindow:
+    """Mean, min, max and last value of a window in O(1) per sample."""
+
+    __slots__ = ("start", "count", "sum", "min", "max", "last")
+
+    def __init__(self, start: float) -> None:
+        """Initialize an empty window starting at the given monotonic time."""
+        self.start = start
+        self.count = 0
+        self.sum = 0.0
+        self.min: float | None = None
+        self.max: float | None = None
+        self.last: float | None = None
+
+    def add(self, value: float) -> None:
+        """Add a sample to the window."""
+        self.count += 1
+        self.sum += value
+        self.last = value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float | None:
+        """Return the mean of the window."""
+        if not self.count:
+            return None
+        return self.sum / self.count
+
+
+class MetricAggregator:
+    """Aggregate readings per command and publish once per window."""
+
+    def __init__(self, window: float, commands: Iterable[str]) -> None:
+        """Initialize the aggregator.
+
+        Args:
+            window (float): window length in seconds
+            commands (Iterable[str]): command types to aggregate, all other
+                data points pass through unchanged.
+
+        """
+        self.window = window
+        self.commands = frozenset(commands)
+        self.raw: dict[str, deque[tuple[float, float]]] = {}
+        self._windows: dict[str, RollingWindow] = {}
+
+    def add(self, dataPoint: HeavnOneData, now: float | None = None) -> HeavnOneData | None:
+        """Add a data point.
+
+        Returns:
+            HeavnOneData: the aggregate if a window was completed, the data
+                point itself if it is not aggregated, otherwise None.
+
+        """
+        if dataPoint.cmd not in self.commands:
+            return dataPoint
+        if now is None:
+            now = time.monotonic()
+
+        value = dataPoint.dataValue
+        self.raw.setdefault(dataPoint.cmd, deque(maxlen=RAW_SAMPLES)).append((now, value))
+
+        window = self._windows.get(dataPoint.cmd)
+        firstWindow = window is None
+        if firstWindow:
+            window = self._windows[dataPoint.cmd] = RollingWindow(now)
+        window.add(value)
+
+        # the first sample is published right away so entities get a state
+        if not firstWindow and now - window.start < self.window:
+            return None
+
+        self._windows[dataPoint.cmd] = RollingWindow(now)
+        mean = window.mean
+        if dataPoint.dataType == 'int':
+            mean = round(mean)
+        return HeavnOneData(
+            dataPoint.cmd,
+            dataPoint.dataType,
+            mean,
+            attributes={
+                "min": window.min,
+                "max": window.max,
+                "last": window.last,
+                "samples": window.count,
+            },
+        )
+
+    def raw_samples(self) -> dict[str, list[tuple[float, float]]]:
+        """Return the recent raw samples per command."""
+        return {cmd: list(samples) for cmd, samples in self.raw.items()}
@@ -0,0 +1,101 @@
+"""Apply protocol operations to many lamps with bounded concurrency."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterable, Sequence
+import logging
+import time
+from typing import TYPE_CHECKING, Any
+
+from .handler import HeavnOneProtocolHandler
+
+if TYPE_CHECKING:
+    from .models import HeavnOneDevice
+
+_LOGGER = logging.getLogger(__name__)
+
+# lamps written at the same time, each one holds a proxy connection slot
+DEFAULT_CONCURRENCY = 3
+# seconds a single lamp may take, including connecting in on-demand mode
+DEFAULT_TIMEOUT = 30.0
+
+
+def build_payload(handler: HeavnOneProtocolHandler, operations: Iterable[Sequence[Any]]) -> bytes:
+    """Chain operations into one payload.
+
+    Args:
+        handler: protocol handler building the requests
+        operations: handler request method name followed by its arguments,
+            e.g. ("reqSetManualMode", True)
+
+    Raises:
+        ValueError: if an operation is unknown or building it fails, e.g.
+            because its arguments do not fit
+    """
+    payload = b''
+    for index, operation in enumerate(operations, 1):
+        name, *args = operation if operation else (None,)
+        if (
+            not isinstance(name, str)
+            or not name.startswith("req")
+            or not callable(getattr(handler, name, None))
+        ):
+            raise ValueError(f"Unknown operation {index}: {name!r}")
+        try:
+            request = getattr(handler, name)(*args)
+        except Exception as err:  # pylint: disable=broad-except
+            raise ValueError(f"Invalid arguments for operation {index} ({name}): {err}") from err
+        if not isinstance(request, bytes):
+            raise ValueError(f"Operation {index} ({name}) does not build a request")
+        payload += request
+    return payload
+
+
+async def _apply(device: HeavnOneDevice, payload: bytes, timeout: float) -> dict:
+    startedAt = time.monotonic()
+    try:
+        await asyncio.wait_for(device.write(payload), timeout)
+    except asyncio.TimeoutError:
+        error = f"not written within {timeout:.0f}s"
+    except Exception as ex:  # pylint: disable=broad-except
+        error = str(ex) or type(ex).__name__
+    else:
+        error = None
+    duration = round(time.monotonic() - startedAt, 3)
+    if error is not None:
+        _LOGGER.warning('(%s) Bulk operation failed: %s', device.address, error)
+    return {"written": error is None, "error": error, "duration": duration}
+
+
+async def run_bulk(
+    devices: Iterable[HeavnOneDevice],
+    payload: bytes,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> dict[str, dict]:
+    """Write a payload to lamps, at most `concurrency` of them at a time.
+
+    Every lamp gets the whole payload as one queued write, a lamp that is
+    not written within `timeout` seconds is reported as failed and its
+    write is withdrawn from the send queue. In on-demand mode a lamp keeps
+    its slot until its connection is closed again, so at most
+    `concurrency` connections are open at a time. The lamp does not
+    acknowledge writes, so the result only tells if the payload was written.
+
+    Returns:
+        written, error and duration in seconds by lamp address
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def apply(device: HeavnOneDevice) -> dict:
+        async with semaphore:
+            result = await _apply(device, payload, timeout)
+            try:
+                await asyncio.wait_for(device.wait_idle(), timeout)
+            except asyncio.TimeoutError:
+                _LOGGER.debug('(%s) Still connected after the bulk write', device.address)
+            return result
+
+    devices = list(devices)
+    results = await asyncio.gather(*(apply(device) for device in devices))
+    return {device.address: result for device, result in zip(devices, results)}
@@ -0,0 +1,115 @@
+"""Approximate lookup tables from side intensity and colour temperature to LED channels.
+
+The tables are synthetic: they mix the nominal temperatures of the LED
+types linearly and are not measured on a lamp. The channel layout is the
+one of the HEAVN One, the only lamp known to speak this protocol.
+"""
+from __future__ import annotations
+
+from array import array
+import bisect
+import dataclasses
+import functools
+
+from .handler import HeavnOneProtocolHandler
+
+# nominal colour temperature of the LED types in kelvin
+WARM_WHITE = 2700
+NEUTRAL_WHITE = 4000
+COLD_WHITE = 6500
+# the blue channel is mixed in above this temperature, up to BLUE_SHARE at COLD_WHITE
+BLUE_START = 5000
+BLUE_SHARE = 0.25
+# temperature grid of the tables in kelvin
+TABLE_STEP = 100
+# highest channel value
+CHANNEL_MAX = 100
+
+
+@dataclasses.dataclass(frozen=True)
+class SideChannels:
+    """LED channels of one side as (channel id, LED type)."""
+
+    channels: tuple[tuple[int, str], ...]
+
+
+# channel layout of the sides, cf. HeavnOneProtocolHandler.CHANNEL_NAMES
+SIDES: tuple[SideChannels, ...] = (
+    SideChannels(((0, "ww"), (1, "nw"), (2, "cw"))),
+    SideChannels(((3, "ww"), (4, "cw"), (5, "blue"))),
+    SideChannels(((6, "ww"), (7, "nw"), (8, "cw"))),
+)
+
+
+def _mix(kelvin: float, types: tuple[str, ...]) -> dict[str, float]:
+    """Return the approximate share of every LED type for a colour temperature."""
+    whites = [(t, k) for t, k in (("ww", WARM_WHITE), ("nw", NEUTRAL_WHITE), ("cw", COLD_WHITE)) if t in types]
+    kelvin = max(whites[0][1], min(whites[-1][1], kelvin))
+    mix = dict.fromkeys(types, 0.0)
+    for (lowType, low), (highType, high) in zip(whites, whites[1:]):
+        if low <= kelvin <= high:
+            share = (kelvin - low) / (high - low)
+            mix[lowType] = 1 - share
+            mix[highType] = share
+            break
+    if "blue" in types and kelvin > BLUE_START:
+        blue = BLUE_SHARE * (kelvin - BLUE_START) / (COLD_WHITE - BLUE_START)
+        mix = {t: v * (1 - blue) for t, v in mix.items()}
+        mix["blue"] = blue
+    return mix
+
+
+class CalibrationTable:
+    """Approximate channel values of every side at full intensity on a temperature grid.
+
+    Values between grid points are interpolated linearly for all channels of
+    a side at once, the intensity scales the row.
+    """
+
+    def __init__(self) -> None:
+        """Build the tables of all sides."""
+        self._handler = HeavnOneProtocolHandler()
+        self.sides = SIDES
+        self.temperatures = array('H', range(WARM_WHITE, COLD_WHITE + 1, TABLE_STEP))
+        # one flat row per temperature, channels of the side in layout order
+        self.rows: list[list[array]] = []
+        for side in self.sides:
+            types = tuple(t for _, t in side.channels)
+            rows = []
+            for kelvin in self.temperatures:
+                mix = _mix(kelvin, types)
+                rows.append(array('f', (mix[t] * CHANNEL_MAX for t in types)))
+            self.rows.append(rows)
+
+    def lookup(self, side: int, intensity: int, temperature: int) -> list[tuple[int, int]]:
+        """Return (channel id, value) of a side.
+
+        Args:
+            side (int): side index (0 = up, 1 = bio, 2 = down)
+            intensity (int): intensity in percent
+            temperature (int): colour temperature in hundreds of kelvin, as
+                taken by the ^D command
+
+        """
+        kelvin = max(self.temperatures[0], min(self.temperatures[-1], temperature * 100))
+        index = min(bisect.bisect_right(self.temperatures, kelvin) - 1, len(self.temperatures) - 2)
+        low, high = self.rows[side][index], self.rows[side][index + 1]
+        share = (kelvin - self.temperatures[index]) / TABLE_STEP
+        scale = max(0, min(100, intensity)) / 100
+        return [
+            (channel, round((a + (b - a) * share) * scale))
+            for (channel, _), a, b in zip(self.sides[side].channels, low, high)
+        ]
+
+    def frame(self, side: int, intensity: int, temperature: int) -> bytes:
+        """Build the SET_CHANNEL_DIRECT payload of a side."""
+        values: list[int | None] = [None] * HeavnOneProtocolHandler.CHANNEL_COUNT
+        for channel, value in self.lookup(side, intensity, temperature):
+            values[channel] = value
+        return self._handler.reqSetChannels(values)
+
+
+@functools.cache
+def calibration_table() -> CalibrationTable:
+    """Return the tables, built only once."""
+    return CalibrationTable()
@@ -0,0 +1,164 @@
+"""Commands a HEAVN One lamp answers, discovered once per firmware."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+import datetime
+
+from .handler import HeavnOneData, HeavnOneProtocolHandler
+from .state import read_requests
+
+# Commands not every firmware answers, probed on the first connection.
+# The CO2 reading arrives with the metrics frame like the other readings,
+# so it is not probed.
+OPTIONAL_COMMANDS = (
+    HeavnOneProtocolHandler.GET_AIR_QUALITY_LED_ENABLED,
+    HeavnOneProtocolHandler.GET_BLUETOOTH_AUTO_OFF_ENABLED,
+    HeavnOneProtocolHandler.GET_LATITUDE,
+    HeavnOneProtocolHandler.GET_LIGHT_SENSOR,
+    HeavnOneProtocolHandler.GET_MANUAL_MODE_ENABLED,
+    HeavnOneProtocolHandler.GET_PRESET_NAME,
+    HeavnOneProtocolHandler.GET_SUN_DOWN_AND_DAWN,
+    HeavnOneProtocolHandler.GET_TOP_MID_BOT,
+    HeavnOneProtocolHandler.channelCommand(0),
+)
+# Seconds to wait for the answers of the probes sent at once.
+PROBE_TIMEOUT = 5.0
+# Seconds to wait for a command asked again on its own.
+RETRY_TIMEOUT = 15.0
+# Connections on which a command must go unanswered before it counts as
+# unsupported, a busy lamp may miss a probe.
+PROBE_MISSES = 3
+# Age after which the commands are probed again.
+CAPABILITY_MAX_AGE = datetime.timedelta(days=7)
+
+QueryFunc = Callable[[bytes, str, float], Awaitable[HeavnOneData | None]]
+
+
+class Capabilities:
+    """Feature array, system configuration and the commands a lamp answers.
+
+    The layout of the feature array (qk) and the system configuration (qc)
+    is not documented, both are kept raw. Whether an optional command is
+    supported is learned by probing it: the lamp has no error answer for
+    commands it does not know, so a command counts as unsupported once it
+    went unanswered on PROBE_MISSES connections.
+    """
+
+    def __init__(self) -> None:
+        """Initialize without knowledge, every command counts as supported."""
+        self.feature_array: str | None = None
+        self.system_configuration: str | None = None
+        self.supported: set[str] = set()
+        self.unsupported: set[str] = set()
+        # unanswered probes by command, reset by an answer
+        self.misses: dict[str, int] = {}
+        self.probed: datetime.datetime | None = None
+
+    @property
+    def known(self) -> bool:
+        """Return if the optional commands were probed."""
+        return bool(self.supported or self.unsupported)
+
+    @property
+    def pending(self) -> tuple[str, ...]:
+        """Return the optional commands without a verdict yet."""
+        return tuple(
+            cmdtype
+            for cmdtype in OPTIONAL_COMMANDS
+            if cmdtype not in self.supported and cmdtype not in self.unsupported
+        )
+
+    def is_supported(self, cmdtype: str) -> bool:
+        """Return if the lamp answers a command type, True while unknown."""
+        if cmdtype.startswith(HeavnOneProtocolHandler.GET_CHANNEL_DIRECT) and cmdtype[1:].isdigit():
+            # all channels stand or fall together
+            cmdtype = HeavnOneProtocolHandler.channelCommand(0)
+        return cmdtype not in self.unsupported
+
+    def expired(self, now: datetime.datetime | None = None) -> bool:
+        """Return if the probe result is older than CAPABILITY_MAX_AGE."""
+        if self.probed is None:
+            return True
+        if now is None:
+            now = datetime.datetime.now(datetime.UTC)
+        return now - self.probed > CAPABILITY_MAX_AGE
+
+    async def probe(
+        self,
+        handler: HeavnOneProtocolHandler,
+        query: QueryFunc,
+        commands: tuple[str, ...] = OPTIONAL_COMMANDS,
+    ) -> bool:
+        """Read qk and qc and ask the lamp for optional commands.
+
+        All requests are queued at once, so lamps lacking some commands only
+        cost a single timeout. The unanswered commands are asked again one
+        at a time with RETRY_TIMEOUT, a command still unanswered counts as a
+        miss.
+
+        Returns:
+            bool: False if nothing was answered, e.g. because the connection
+                was lost, nothing is recorded then
+        """
+        requests = read_requests(handler)
+        featureArray, systemConfiguration, *answers = await asyncio.gather(
+            query(handler.reqFeatureArray(), handler.GET_FEATURE_ARRAY, PROBE_TIMEOUT),
+            query(handler.reqSystemConfiguration(), handler.GET_SYSTEM_CONFIGURATION, PROBE_TIMEOUT),
+            *(query(requests[cmdtype](), cmdtype, PROBE_TIMEOUT) for cmdtype in commands),
+        )
+        answered = {cmdtype for cmdtype, answer in zip(commands, answers) if answer is not None}
+        if not answered and featureArray is None and systemConfiguration is None:
+            return False
+        for cmdtype in commands:
+            if cmdtype not in answered and await query(
+                requests[cmdtype](), cmdtype, RETRY_TIMEOUT
+            ) is not None:
+                answered.add(cmdtype)
+
+        if featureArray is not None:
+            self.feature_array = featureArray.dataValue
+        if systemConfiguration is not None:
+            self.system_configuration = systemConfiguration.dataValue
+        for cmdtype in commands:
+            if cmdtype in answered:
+                self.supported.add(cmdtype)
+                self.unsupported.discard(cmdtype)
+                self.misses.pop(cmdtype, None)
+            elif cmdtype not in self.unsupported:
+                self.supported.discard(cmdtype)
+                self.misses[cmdtype] = self.misses.get(cmdtype, 0) + 1
+                if self.misses[cmdtype] >= PROBE_MISSES:
+                    self.unsupported.add(cmdtype)
+                    del self.misses[cmdtype]
+        self.probed = datetime.datetime.now(datetime.UTC)
+        return True
+
+    def as_dict(self) -> dict:
+        """Return the capabilities as plain data, e.g. for a cache."""
+        return {
+            "feature_array": self.feature_array,
+            "system_configuration": self.system_configuration,
+            "supported": sorted(self.supported),
+            "unsupported": sorted(self.unsupported),
+            "misses": dict(self.misses),
+            "probed": self.probed.isoformat() if self.probed is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Capabilities:
+        """Restore capabilities stored with as_dict."""
+        self = cls()
+        self.feature_array = data.get("feature_array")
+        self.system_configuration = data.get("system_configuration")
+        # commands no longer probed keep no verdict
+        self.supported = set(data.get("supported", ())) & set(OPTIONAL_COMMANDS)
+        self.unsupported = set(data.get("unsupported", ())) & set(OPTIONAL_COMMANDS)
+        self.misses = {
+            cmdtype: misses
+            for cmdtype, misses in data.get("misses", {}).items()
+            if cmdtype in OPTIONAL_COMMANDS
+        }
+        if data.get("probed") is not None:
+            self.probed = datetime.datetime.fromisoformat(data["probed"])
+        return self
@@ -0,0 +1,201 @@
+"""Record and replay of HEAVN One BLE traffic.
+
+A capture file starts with MAGIC followed by records of a fixed header
+(nanoseconds since the session started, direction, payload length) and the
+payload. Every new session, i.e. every time the file is opened for writing,
+starts with a SESSION record holding the wall clock time. A file is kept
+below MAX_CAPTURE_SIZE bytes. When a session starts on a file that is more
+than half full, the file is moved aside to <path>.1 first.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Iterator
+import dataclasses
+import datetime
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+
+from .handler import HeavnOneData, HeavnOneProtocolHandler, InvalidProtocolData
+from .state import StateStore
+
+MAGIC = b"HVNCAP1\n"
+RECORD = struct.Struct("<QBH")
+MAX_CAPTURE_SIZE = 50 * 1024 * 1024
+
+OUTGOING = 0
+INCOMING = 1
+SESSION = 2
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass(frozen=True)
+class CaptureRecord:
+    """A single captured payload."""
+
+    timestamp: float
+    direction: int
+    data: bytes
+
+
+class CaptureWriter:
+    """Append payloads to a capture file.
+
+    write() only queues the record, so it can be called from the event
+    loop. A thread writes the records and flushes whenever it caught up.
+    Once the file reached max_size, further records are dropped.
+    """
+
+    def __init__(self, path: str, max_size: int = MAX_CAPTURE_SIZE) -> None:
+        """Open the file, this does blocking I/O."""
+        self.path = path
+        self.max_size = max_size
+        self.records = 0
+        self.dropped = 0
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size > max_size // 2:
+            os.replace(path, f"{path}.1")
+            size = 0
+        self._file = open(path, "ab")
+        if size == 0:
+            self._file.write(MAGIC)
+            size = len(MAGIC)
+        self.size = size
+        self._queue: queue.SimpleQueue[bytes | None] = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name=f"capture {path}", daemon=True)
+        self._thread.start()
+        self._start = time.monotonic_ns()
+        self.write(SESSION, datetime.datetime.now(datetime.UTC).isoformat().encode("ascii"))
+
+    def write(self, direction: int, data: bytes) -> None:
+        """Queue a payload with the current monotonic timestamp."""
+        record = RECORD.pack(time.monotonic_ns() - self._start, direction, len(data)) + bytes(data)
+        if self.size + len(record) > self.max_size:
+            if not self.dropped:
+                _LOGGER.warning("Capture %s reached %d bytes, dropping further records", self.path, self.max_size)
+            self.dropped += 1
+            return
+        self.size += len(record)
+        self.records += 1
+        self._queue.put(record)
+
+    def _run(self) -> None:
+        while (record := self._queue.get()) is not None:
+            self._file.write(record)
+            if self._queue.empty():
+                self._file.flush()
+        self._file.close()
+
+    def close(self) -> None:
+        """Write the queued records and close the file, this blocks."""
+        self._queue.put(None)
+        self._thread.join()
+
+
+def read_capture(path: str) -> Iterator[CaptureRecord]:
+    """Iterate over the records of a capture file."""
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a HEAVN One capture")
+        while header := file.read(RECORD.size):
+            if len(header) < RECORD.size:
+                break  # truncated by a crash while writing
+            timestamp, direction, length = RECORD.unpack(header)
+            data = file.read(length)
+            if len(data) < length:
+                break
+            yield CaptureRecord(timestamp / 1e9, direction, data)
+
+
+async def replay(
+    records: Iterator[CaptureRecord],
+    handle_notify: Callable[[int, bytearray], None],
+    realtime: bool = True,
+) -> dict:
+    """Feed the captured notifications to a notify handler.
+
+    Args:
+        records: records, e.g. from read_capture
+        handle_notify: e.g. HeavnOneDevice.handle_notify
+        realtime: keep the captured timing, otherwise replay at full speed
+
+    Returns:
+        dict: replay statistics
+    """
+    loop = asyncio.get_running_loop()
+    notifications = 0
+    outgoing = 0
+    started = loop.time()
+    sessionStart = started
+    for record in records:
+        if record.direction == SESSION:
+            sessionStart = loop.time()
+            continue
+        if record.direction == OUTGOING:
+            outgoing += 1
+            continue
+        if realtime:
+            delay = sessionStart + record.timestamp - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        handle_notify(0, bytearray(record.data))
+        notifications += 1
+        if not realtime and notifications % 1000 == 0:
+            # let the entities and other tasks run
+            await asyncio.sleep(0)
+
+    elapsed = loop.time() - started
+    return {
+        "notifications": notifications,
+        "outgoing": outgoing,
+        "elapsed": elapsed,
+        "rate": notifications / elapsed if elapsed else None,
+    }
+
+
+async def _no_query(*_) -> None:
+    """Stand in for the lamp of a detached state store, which is never read."""
+    raise RuntimeError("A replayed state cannot be read from a lamp")
+
+
+async def replay_detached(records: Iterator[CaptureRecord], realtime: bool = False) -> dict:
+    """Parse captured notifications into a handler and state store of their own.
+
+    Nothing of a live lamp is touched: its state, entities, statistics,
+    pending queries and capture file only see its own traffic.
+
+    Returns:
+        dict: replay statistics, parse failures and the replayed state
+    """
+    handler = HeavnOneProtocolHandler()
+    state = StateStore(handler, _no_query, _no_query)
+    parseFailures = 0
+
+    def handle_notify(_: int, data: bytearray) -> None:
+        nonlocal parseFailures
+        try:
+            dataPoint = handler.handleResponse(data)
+        except (InvalidProtocolData, ValueError, IndexError, UnicodeDecodeError):
+            parseFailures += 1
+            return
+        if dataPoint is None:
+            return
+        readings: tuple[HeavnOneData, ...] = (dataPoint,)
+        if dataPoint.cmd == handler.GET_METRICS_GET:
+            readings = tuple(dataPoint.dataValue.values())
+        for reading in readings:
+            state.update(reading)
+
+    result = await replay(records, handle_notify, realtime)
+    return {
+        **result,
+        "parse_failures": parseFailures,
+        "unknown_commands": handler.unknownCommands,
+        "incomplete_frames": handler.incompleteFrames,
+        "state": state.as_dict()["values"],
+    }
@@ -0,0 +1,138 @@
+"""Offset and drift estimation of the HEAVN One real time clock."""
+from __future__ import annotations
+
+import datetime
+
+# seconds of clock error tolerated before the clock is written
+CLOCK_THRESHOLD = 2.0
+# bounds of the interval between two clock reads in seconds
+CLOCK_SYNC_MIN_INTERVAL = 600
+CLOCK_SYNC_MAX_INTERVAL = 6 * 3600
+# the lamp truncates its clock to whole seconds, so the reported time is on
+# average half a second behind it
+TRUNCATION_BIAS = 0.5
+# time zone transitions happen on full quarter hours
+TRANSITION_STEP = datetime.timedelta(minutes=15)
+
+
+def next_offset_change(
+    tz: datetime.tzinfo | None, now: datetime.datetime, horizon: float
+) -> datetime.datetime | None:
+    """Return the first UTC offset change of a time zone within horizon seconds.
+
+    Args:
+        tz: time zone, None for the system time zone
+        now: aware start time
+        horizon: seconds to look ahead
+
+    Returns:
+        datetime: first quarter hour with the new offset, None if there is
+            no change, e.g. a daylight saving time transition
+    """
+    offset = now.astimezone(tz).utcoffset()
+    end = now + datetime.timedelta(seconds=horizon)
+    when = now - datetime.timedelta(
+        minutes=now.minute % 15, seconds=now.second, microseconds=now.microsecond
+    ) + TRANSITION_STEP
+    while when <= end:
+        if when.astimezone(tz).utcoffset() != offset:
+            return when
+        when += TRANSITION_STEP
+    return None
+
+
+class ClockSync:
+    """Estimate offset and drift of the lamp clock from timed reads.
+
+    Every read gives one offset sample, taken at the midpoint of the round
+    trip. Offset and drift are a least squares fit over all samples since
+    the clock was last written, kept as running sums.
+    """
+
+    def __init__(self, threshold: float = CLOCK_THRESHOLD) -> None:
+        """Initialize the estimator with the tolerated clock error."""
+        self.threshold = threshold
+        self.last_rtt: float | None = None
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget all samples, e.g. after the clock was written."""
+        self._origin: float | None = None
+        self._n = 0
+        self._sum_t = 0.0
+        self._sum_o = 0.0
+        self._sum_tt = 0.0
+        self._sum_to = 0.0
+
+    def add_sample(self, sent: datetime.datetime, received: datetime.datetime, lamp_time: datetime.datetime) -> float:
+        """Add a clock read.
+
+        Args:
+            sent (datetime): time the request was written
+            received (datetime): time the answer arrived
+            lamp_time (datetime): time reported by the lamp
+
+        Returns:
+            float: offset of this sample in seconds (positive = lamp ahead)
+
+        """
+        rtt = (received - sent).total_seconds()
+        midpoint = sent + datetime.timedelta(seconds=rtt / 2)
+        offset = (lamp_time - midpoint).total_seconds() + TRUNCATION_BIAS
+        self.last_rtt = rtt
+
+        timestamp = midpoint.timestamp()
+        if self._origin is None:
+            self._origin = timestamp
+        t = timestamp - self._origin
+        self._n += 1
+        self._sum_t += t
+        self._sum_o += offset
+        self._sum_tt += t * t
+        self._sum_to += t * offset
+        return offset
+
+    @property
+    def samples(self) -> int:
+        """Return the number of samples since the last reset."""
+        return self._n
+
+    @property
+    def drift(self) -> float:
+        """Return the estimated drift in seconds per second."""
+        denominator = self._n * self._sum_tt - self._sum_t * self._sum_t
+        if self._n < 2 or denominator <= 0:
+            return 0.0
+        return (self._n * self._sum_to - self._sum_t * self._sum_o) / denominator
+
+    def offset(self, now: datetime.datetime) -> float | None:
+        """Return the estimated offset at the given time."""
+        if not self._n:
+            return None
+        drift = self.drift
+        intercept = (self._sum_o - drift * self._sum_t) / self._n
+        return intercept + drift * (now.timestamp() - self._origin)
+
+    def needs_write(self, now: datetime.datetime) -> bool:
+        """Return if the estimated error exceeds the threshold."""
+        offset = self.offset(now)
+        return offset is not None and abs(offset) > self.threshold
+
+    def next_sync_in(self, now: datetime.datetime) -> float:
+        """Return seconds until the error is expected to reach half the threshold."""
+        offset = self.offset(now) or 0.0
+        drift = self.drift
+        if not drift:
+            return CLOCK_SYNC_MAX_INTERVAL
+        remaining = self.threshold / 2 - abs(offset)
+        seconds = remaining / abs(drift) if remaining > 0 else 0
+        return max(CLOCK_SYNC_MIN_INTERVAL, min(CLOCK_SYNC_MAX_INTERVAL, seconds))
+
+    def as_dict(self, now: datetime.datetime) -> dict:
+        """Return the estimate as plain data."""
+        return {
+            "samples": self._n,
+            "offset": self.offset(now),
+            "drift_ppm": self.drift * 1e6,
+            "last_rtt": self.last_rtt,
+        }
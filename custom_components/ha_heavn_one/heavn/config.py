@@ -0,0 +1,154 @@
+"""Desired device settings of a HEAVN One lamp and diff based reconciliation."""
+from __future__ import annotations
+
+from collections.abc import Callable
+import dataclasses
+from typing import Any
+
+from .handler import HeavnOneProtocolHandler
+from .state import StateStore, StateValue
+
+# latitude and longitude are written with four decimals
+LOCATION_TOLERANCE = 0.00005
+
+
+@dataclasses.dataclass(frozen=True, kw_only=True)
+class ConfigSetting:
+    """A setting, the state field holding it and how to write it.
+
+    Several keys may share a write, e.g. presence and its timeout are sent
+    in one command, the value of the key left out is kept.
+    """
+
+    keys: tuple[str, ...]
+    cmdtype: str
+    write: Callable[..., bytes]
+    values: Callable[[StateValue], tuple] = lambda state: (state.value,)
+    equal: Callable[[Any, Any], bool] = lambda wanted, known: wanted == known
+
+
+def _same_location(wanted: float, known: float | None) -> bool:
+    return known is not None and abs(wanted - known) < LOCATION_TOLERANCE
+
+
+# the UTC offset is left out, the clock sync keeps it at the local offset
+SETTINGS: tuple[ConfigSetting, ...] = (
+    ConfigSetting(
+        keys=("name",),
+        cmdtype=HeavnOneProtocolHandler.GET_NAME,
+        write=lambda handler, name: handler.reqSetName(name),
+        equal=lambda wanted, known: known is not None and wanted.rstrip() == known.rstrip(),
+    ),
+    ConfigSetting(
+        keys=("latitude",),
+        cmdtype=HeavnOneProtocolHandler.GET_LATITUDE,
+        write=lambda handler, latitude: handler.reqSetLatitude(latitude),
+        equal=_same_location,
+    ),
+    ConfigSetting(
+        keys=("longitude",),
+        cmdtype=HeavnOneProtocolHandler.GET_LONGITUDE,
+        write=lambda handler, longitude: handler.reqSetLongitude(longitude),
+        equal=_same_location,
+    ),
+    ConfigSetting(
+        keys=("presence", "presence_timeout"),
+        cmdtype=HeavnOneProtocolHandler.GET_PRESENCE,
+        write=lambda handler, enabled, timeout: handler.reqSetPresence(enabled, timeout),
+        values=lambda state: (state.value, (state.attributes or {}).get("timeout")),
+    ),
+    ConfigSetting(
+        keys=("air_quality_led",),
+        cmdtype=HeavnOneProtocolHandler.GET_AIR_QUALITY_LED_ENABLED,
+        write=lambda handler, enabled: handler.reqSetAirQualityLED(enabled),
+        # reported as 0 / 1
+        equal=lambda wanted, known: known is not None and wanted == bool(known),
+    ),
+    ConfigSetting(
+        keys=("gesture_sensors",),
+        cmdtype=HeavnOneProtocolHandler.GET_GESTURE_SENSORS_ENABLED,
+        write=lambda handler, enabled: handler.reqSetGestureSensorsEnabled(enabled),
+    ),
+    ConfigSetting(
+        keys=("bluetooth_auto_off",),
+        cmdtype=HeavnOneProtocolHandler.GET_BLUETOOTH_AUTO_OFF_ENABLED,
+        write=lambda handler, enabled: handler.reqSetBluetoothAutoOff(enabled),
+    ),
+    ConfigSetting(
+        keys=("coworking_mode",),
+        cmdtype=HeavnOneProtocolHandler.GET_COWORKING_MODE_ENABLE,
+        write=lambda handler, enabled: handler.reqSetCoworkingMode(enabled),
+    ),
+    ConfigSetting(
+        keys=("coworking_default_intensity",),
+        cmdtype=HeavnOneProtocolHandler.GET_COWORKING_DEFAULT_INTENSITY,
+        write=lambda handler, intensity: handler.reqSetCoworkingDefaultIntensity(intensity),
+    ),
+)
+
+CONFIG_KEYS = tuple(key for setting in SETTINGS for key in setting.keys)
+
+
+class ConfigManager:
+    """Compare a desired config with the state of a lamp and write only what differs.
+
+    A desired config is a dict with some of CONFIG_KEYS, keys left out are
+    not managed.
+    """
+
+    def __init__(self, handler: HeavnOneProtocolHandler, state: StateStore) -> None:
+        """Initialize the manager."""
+        self._handler = handler
+        self._state = state
+
+    @property
+    def current(self) -> dict[str, Any]:
+        """Return the settings as last reported by the lamp."""
+        current: dict[str, Any] = {}
+        for setting in SETTINGS:
+            state = self._state.peek(setting.cmdtype)
+            if state is not None:
+                current.update(zip(setting.keys, setting.values(state)))
+        return current
+
+    def settings(self, desired: dict[str, Any]) -> list[ConfigSetting]:
+        """Return the settings a desired config manages."""
+        return [setting for setting in SETTINGS if any(key in desired for key in setting.keys)]
+
+    def fields(self, desired: dict[str, Any]) -> list[str]:
+        """Return the state fields holding the settings a desired config manages."""
+        return [setting.cmdtype for setting in self.settings(desired)]
+
+    def differing(self, desired: dict[str, Any]) -> list[str]:
+        """Return the keys whose reported value differs from the desired one."""
+        current = self.current
+        keys = []
+        for setting in self.settings(desired):
+            for key in setting.keys:
+                if key in desired and not setting.equal(desired[key], current.get(key)):
+                    keys.append(key)
+        return keys
+
+    def diff(self, desired: dict[str, Any]) -> bytes:
+        """Build one chained payload writing the settings that differ.
+
+        Settings the lamp did not report are never written, it may not
+        support them.
+
+        Returns:
+            bytes: payload, empty if the lamp already matches
+        """
+        current = self.current
+        differing = set(self.differing(desired))
+        payload = b''
+        for setting in self.settings(desired):
+            if not differing.intersection(setting.keys) or not self.known(setting):
+                continue
+            values = [desired.get(key, current[key]) for key in setting.keys]
+            payload += setting.write(self._handler, *values)
+        return payload
+
+    def known(self, setting: ConfigSetting) -> bool:
+        """Return if the lamp reported the current value of a setting."""
+        current = self.current
+        return all(current.get(key) is not None for key in setting.keys)
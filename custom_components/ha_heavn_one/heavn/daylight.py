@@ -0,0 +1,171 @@
+"""Closed-loop daylight harvesting on the ambient light sensor (qL)."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .models import HeavnOneDevice
+
+_LOGGER = logging.getLogger(__name__)
+
+# seconds between two samples, shortest while adjusting, longest while stable
+MIN_INTERVAL = 1.0
+MAX_INTERVAL = 10.0
+# relative error below which nothing is adjusted
+DEADBAND = 0.05
+# relative change of the reading that counts as changing light
+CHANGE_THRESHOLD = 0.02
+# percent of intensity per unit of relative error and step
+GAIN = 50.0
+# largest intensity change per step in percent
+MAX_STEP = 10
+# smallest intensity change worth a write in percent
+HYSTERESIS = 3
+
+
+class DaylightController:
+    """Keep the ambient light at a target by adjusting side intensities.
+
+    The sensor is sampled every MIN_INTERVAL seconds while the light changes
+    or the target is missed, the interval doubles up to MAX_INTERVAL while
+    it is stable. Every sample moves the intensity by at most MAX_STEP
+    percent and a write is only sent if it changes by HYSTERESIS percent.
+    In on-demand mode every sample opens a connection, so the sensor is
+    sampled at most once per poll interval.
+
+    A side keeps its colour temperature: the last manual setting written
+    to it, else the one of its preset. Sides without either are left
+    alone.
+    """
+
+    def __init__(
+        self,
+        device: HeavnOneDevice,
+        target: float,
+        sides: tuple[int, ...] = (0, 1, 2),
+    ) -> None:
+        """Initialize the controller.
+
+        Args:
+            device: lamp to control
+            target: ambient light to keep, in the unit of the light sensor
+            sides: sides to dim (0 = up, 1 = bio, 2 = down)
+        """
+        self._device = device
+        self.target = target
+        self.sides = sides
+        self.intensity: int | None = None
+        self.interval = MIN_INTERVAL
+        self.last_reading: float | None = None
+        self.samples = 0
+        self.writes = 0
+
+    def _initial_intensity(self) -> int:
+        state = self._device.state.peek(self._device.handler.SET_INTENSITY)
+        if state is not None:
+            return max(state.value[side] for side in self.sides)
+        return 50
+
+    def step(self, reading: float) -> int | None:
+        """Process a sample and return the intensity to write, if any."""
+        self.samples += 1
+        if self.intensity is None:
+            self.intensity = self._initial_intensity()
+        error = (self.target - reading) / self.target
+        changing = (
+            self.last_reading is not None
+            and abs(reading - self.last_reading) > CHANGE_THRESHOLD * self.target
+        )
+        self.last_reading = reading
+
+        if abs(error) <= DEADBAND:
+            self.interval = MIN_INTERVAL if changing else min(self.interval * 2, MAX_INTERVAL)
+            return None
+        self.interval = MIN_INTERVAL
+
+        delta = max(-MAX_STEP, min(MAX_STEP, GAIN * error))
+        intensity = max(0, min(100, round(self.intensity + delta)))
+        if abs(intensity - self.intensity) < HYSTERESIS:
+            return None
+        self.intensity = intensity
+        return intensity
+
+    @property
+    def sample_interval(self) -> float:
+        """Return the seconds until the next sample."""
+        if self._device.on_demand:
+            return max(self.interval, self._device.poll_interval)
+        return self.interval
+
+    async def _temperatures(self) -> dict[int, int]:
+        """Return the colour temperature to keep by side."""
+        handler = self._device.handler
+        state = self._device.state
+        temperatures = {}
+        presets = []
+        for side in self.sides:
+            manual = state.peek(handler.manualSideCommand(side))
+            if manual is not None:
+                temperatures[side] = manual.value[1]
+            else:
+                presets.append(side)
+        if presets:
+            values = await state.get_many([handler.presetSideCommand(side) for side in presets])
+            for side in presets:
+                preset = values.get(handler.presetSideCommand(side))
+                if preset is not None:
+                    temperatures[side] = preset.value[1]
+        return temperatures
+
+    async def _write(self, intensity: int) -> None:
+        handler = self._device.handler
+        transitions = self._device.transitions
+        written = []
+        payload = b''
+        temperatures = await self._temperatures()
+        for side in self.sides:
+            if side not in temperatures or transitions.active(side):
+                # a fade started by the user wins
+                continue
+            temperature = temperatures[side]
+            payload += transitions.frame_func(side, intensity, temperature)
+            written.append((side, temperature))
+        if not payload:
+            return
+        manualMode = self._device.state.peek(handler.GET_MANUAL_MODE_ENABLED)
+        if manualMode is None or not manualMode.value:
+            # manual side settings only apply in manual mode
+            payload = handler.reqSetManualMode(True) + payload
+        self._device.queue_send(payload)
+        for side, temperature in written:
+            self._device.record_manual_side(side, intensity, temperature)
+        self.writes += 1
+
+    async def run(self) -> None:
+        """Sample and adjust until cancelled."""
+        handler = self._device.handler
+        while True:
+            if not self._device.capabilities.is_supported(handler.GET_LIGHT_SENSOR):
+                dataPoint = None
+            else:
+                dataPoint = await self._device.query(handler.reqLightSensor(), handler.GET_LIGHT_SENSOR)
+            if dataPoint is not None:
+                intensity = self.step(dataPoint.dataValue)
+                if intensity is not None:
+                    _LOGGER.debug('(%s) Ambient light %.2f, intensity %d', self._device.address, dataPoint.dataValue, intensity)
+                    await self._write(intensity)
+            await asyncio.sleep(self.sample_interval)
+
+    def as_dict(self) -> dict:
+        """Return the controller state as plain data."""
+        return {
+            "target": self.target,
+            "sides": list(self.sides),
+            "intensity": self.intensity,
+            "interval": self.sample_interval,
+            "last_reading": self.last_reading,
+            "samples": self.samples,
+            "writes": self.writes,
+        }
@@ -0,0 +1,117 @@
+"""Streaming noise filters for the BME680 readings of a HEAVN One lamp."""
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from collections import deque
+
+from .handler import HeavnOneData
+
+FILTER_NONE = "none"
+FILTER_EMA = "ema"
+FILTER_MEDIAN = "median"
+FILTERS = [FILTER_NONE, FILTER_EMA, FILTER_MEDIAN]
+
+EMA_ALPHA = 0.3
+MEDIAN_SIZE = 5
+# highest CO2 accuracy reported by the BME680
+MAX_ACCURACY = 3
+
+
+class EmaFilter:
+    """Exponential moving average."""
+
+    def __init__(self, alpha: float = EMA_ALPHA) -> None:
+        """Initialize the filter with the weight of a new sample."""
+        self.alpha = alpha
+        self.value: float | None = None
+
+    def update(self, value: float) -> float:
+        """Add a sample and return the filtered value."""
+        if self.value is None:
+            self.value = value
+        else:
+            self.value += self.alpha * (value - self.value)
+        return self.value
+
+
+class MedianFilter:
+    """Median of the last N samples.
+
+    N is small and fixed, so keeping a sorted copy is constant work per sample.
+    """
+
+    def __init__(self, size: int = MEDIAN_SIZE) -> None:
+        """Initialize the filter with the number of samples."""
+        self._samples: deque[float] = deque(maxlen=size)
+        self._sorted: list[float] = []
+
+    def update(self, value: float) -> float:
+        """Add a sample and return the filtered value."""
+        if len(self._samples) == self._samples.maxlen:
+            del self._sorted[bisect_left(self._sorted, self._samples[0])]
+        self._samples.append(value)
+        insort(self._sorted, value)
+        return self._sorted[len(self._sorted) // 2]
+
+
+class SpikeFilter:
+    """Reject single jumps larger than a limit until they are confirmed.
+
+    A jump is accepted once it was seen on consecutive samples. The less
+    accurate the sensor reports itself, the more confirmations are needed.
+    """
+
+    def __init__(self, max_delta: float, confirm: int = 1) -> None:
+        """Initialize the filter.
+
+        Args:
+            max_delta (float): largest change accepted without confirmation
+            confirm (int): confirmations needed at full accuracy
+
+        """
+        self.max_delta = max_delta
+        self.confirm = confirm
+        self.value: float | None = None
+        self._pending = 0
+
+    def update(self, value: float, accuracy: int | None = None) -> float | None:
+        """Add a sample and return it, or None if it is rejected as spike."""
+        if self.value is None or abs(value - self.value) <= self.max_delta:
+            self.value = value
+            self._pending = 0
+            return value
+
+        needed = self.confirm
+        if accuracy is not None:
+            needed += MAX_ACCURACY - max(0, min(accuracy, MAX_ACCURACY))
+        self._pending += 1
+        if self._pending <= needed:
+            return None
+
+        self.value = value
+        self._pending = 0
+        return value
+
+
+class FilterChain:
+    """Spike rejection followed by smoothing for one reading."""
+
+    def __init__(self, smoothing: str = FILTER_NONE, spike: SpikeFilter | None = None) -> None:
+        """Initialize the chain from a filter name and an optional spike filter."""
+        self.spike = spike
+        self.smoothing = None
+        if smoothing == FILTER_EMA:
+            self.smoothing = EmaFilter()
+        elif smoothing == FILTER_MEDIAN:
+            self.smoothing = MedianFilter()
+
+    def update(self, dataPoint: HeavnOneData, accuracy: int | None = None) -> HeavnOneData | None:
+        """Filter a data point, returns None if it was rejected."""
+        value = dataPoint.dataValue
+        if self.spike is not None:
+            value = self.spike.update(value, accuracy)
+            if value is None:
+                return None
+        if self.smoothing is not None:
+            value = round(self.smoothing.update(value), 2)
+        return HeavnOneData(dataPoint.cmd, dataPoint.dataType, value, dataPoint.attributes)
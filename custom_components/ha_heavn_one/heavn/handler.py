@@ -1,4 +1,5 @@
 """Implementation of the HEAVN One Lamp Protocol."""
+from array import array
 import datetime
 import logging
 
@@ -11,18 +12,20 @@ class InvalidProtocolData(Exception):
 class HeavnOneData:
     """Wrapper for HeavnOne sensor / command responses."""
 
-    def __init__(self, cmd: str, dataType: str, dataValue: any) -> None:
+    def __init__(self, cmd: str, dataType: str, dataValue: any, attributes: dict | None = None) -> None:
         """Initialize HeavnOneData Wrapper.
 
         Args:
             cmd (str): Command type string (cf. HeavnOneProtocolHandler)
             dataType (str): Data Type in string (str, int, float, datetime,...)
             dataValue (any): Data value
+            attributes (dict): Additional information on the value (optional)
 
         """
         self.cmd = cmd
         self.dataType = dataType
         self.dataValue = dataValue
+        self.attributes = attributes
 
     def __str__(self) -> str:
         """Return object as string representation.
@@ -152,6 +155,77 @@ class HeavnOneProtocolHandler:
     TEMPERATURE = "t"
     TOGGLE_MANUAL_MODE = "R"
     SIDES = ['up', 'bio', 'down']
+    # @GN and the name must fit a single 20 byte write at the default ATT MTU
+    NAME_MAX_LENGTH = 17
+    # channel 9 is answered by the lamp but not documented; answers carry a
+    # single digit channel id, so channel 10 cannot be told from channel 1
+    CHANNEL_NAMES = [
+        'Top WW', 'Top NW', 'Top CW',
+        'Mid WW', 'Mid CW', 'Mid Blue',
+        'Bot WW', 'Bot NW', 'Bot CW',
+        'Channel 9',
+    ]
+    CHANNEL_COUNT = len(CHANNEL_NAMES)
+    # channel values are written zero padded like all other intensities
+    CHANNEL_VALUE_DIGITS = 3
+    CHANNEL_UNKNOWN = -1
+    # data points of the readings in a reqGetMetrics frame
+    METRICS_READINGS = (GET_CO2, GET_CO2_ACCURACY, GET_TEMPERATURE, GET_PRESSURE, GET_HUMIDITY)
+    # epoch seconds below this are relative (e.g. since boot), not a date
+    MIN_DEVICE_EPOCH = 1577836800
+
+    def __init__(self) -> None:
+        """Initialize the protocol handler."""
+        # last known value per LED channel, indexed by channel id
+        self.channels = array('h', [self.CHANNEL_UNKNOWN] * self.CHANNEL_COUNT)
+        # number of responses without a known command
+        self.unknownCommands = 0
+        # answers of reqGetMetrics waiting for the sample timestamp
+        self._metricsFrame: dict[str, HeavnOneData] = {}
+        # number of metrics frames stamped with the receive time
+        self.incompleteFrames = 0
+        # the firmware answers reqGetMetrics without the sample timestamp
+        self.metricsWithoutTimestamp = False
+
+    @classmethod
+    def presetSideCommand(cls, side: int) -> str:
+        """Return the data point command type of one preset side.
+
+        Args:
+            side (int): index into SIDES
+
+        Returns:
+            str: command type, e.g. ^s1
+        """
+        return cls.GET_PRESET_DATA + str(side)
+
+    @classmethod
+    def manualSideCommand(cls, side: int) -> str:
+        """Return the data point command type of one manual side setting.
+
+        The answer to ^d is not parsed, the value is the last setting
+        written by the integration.
+
+        Args:
+            side (int): index into SIDES
+
+        Returns:
+            str: command type, e.g. ^d1
+        """
+        return cls.COMMAND_SIDE_MANUAL_GET + str(side)
+
+    @classmethod
+    def channelCommand(cls, channel: int) -> str:
+        """Return the data point command type of a single LED channel.
+
+        Args:
+            channel (int): channel id
+
+        Returns:
+            str: command type, e.g. c3
+
+        """
+        return cls.GET_CHANNEL_DIRECT + str(channel)
 
     def reqCO2(self):
         return self._buildCommand(self.GET_CO2)
@@ -162,6 +236,27 @@ class HeavnOneProtocolHandler:
     def reqAirQualityLED(self):
         return self._buildCommand(self.GET_AIR_QUALITY_LED_ENABLED)
 
+    def reqBluetoothAutoOff(self):
+        return self._buildCommand(self.GET_BLUETOOTH_AUTO_OFF_ENABLED)
+
+    def reqGestureSensorsEnabled(self):
+        return self._buildCommand(self.GET_GESTURE_SENSORS_ENABLED)
+
+    def reqCoworkingDefaultIntensity(self):
+        return self._buildCommand(self.GET_COWORKING_DEFAULT_INTENSITY)
+
+    def reqCoworkingMode(self):
+        return self._buildCommand(self.GET_COWORKING_MODE_ENABLE)
+
+    def reqGetPresence(self):
+        return self._buildCommand(self.GET_PRESENCE)
+
+    def reqFeatureArray(self):
+        return self._buildCommand(self.GET_FEATURE_ARRAY)
+
+    def reqSystemConfiguration(self):
+        return self._buildCommand(self.GET_SYSTEM_CONFIGURATION)
+
     def reqLightSensor(self):
         return self._buildCommand(self.GET_LIGHT_SENSOR)
 
@@ -193,9 +288,26 @@ class HeavnOneProtocolHandler:
     def reqCoffeeRelaxActivity(self):
         return self._buildCommand(self.GET_COFFEE_RELAX_ACTIVITY)
 
+    def reqGetUtcOffset(self):
+        return self._buildCommand(self.GET_UTC_OFFSET)
+
+    def reqSetName(self, name: str):
+        """Build command to rename the device
+
+        Args:
+            name (str): new name, ASCII only, at most NAME_MAX_LENGTH characters
+
+        Returns:
+            bytes: command
+        """
+        self._checkName(name)
+        if len(name) > self.NAME_MAX_LENGTH:
+            raise ValueError('Names must not exceed {:d} characters: {:s}'.format(self.NAME_MAX_LENGTH, name))
+        return self._buildCommand(self.SET_NAME, name)
+
     def reqSetUtcTime(self, dt=None):
         if not dt:
-            dt = datetime.datetime.utcnow()
+            dt = datetime.datetime.now(datetime.UTC)
         pr = dt.strftime('%H%M%S')
         return self._buildCommand(self.SET_UTC_TIME, pr)
 
@@ -211,6 +323,18 @@ class HeavnOneProtocolHandler:
         pr = dt.strftime('%H%M%S%d%m%y')
         return self._buildCommand(self.SET_SUN_CYCLE_TIME, pr)
 
+    def reqGetLocation(self):
+        return self._buildCommand(
+            self.PREFIX + self.GET_LATITUDE + self.PREFIX + self.GET_LONGITUDE,
+            skipPrefix=True
+        )
+
+    def reqSetLatitude(self, latitude: float):
+        return self._buildCommand(self.SET_LATITUDE, '{:.4f}'.format(latitude))
+
+    def reqSetLongitude(self, longitude: float):
+        return self._buildCommand(self.SET_LONGITUDE, '{:.4f}'.format(longitude))
+
     def reqGetSunCycleTime(self):
         return self._buildCommand(self.GET_SUN_CYCLE_TIME)
 
@@ -239,12 +363,35 @@ class HeavnOneProtocolHandler:
         # 0 = TopWW, 1 = TopNW, 2 = TopCW, 3 = MidWW, 4 = MidCW, 5 = MidBlue, 6 = BotWW, 7 = BotNW, 8 = BotCW
         commands = b''
         if channel is None:
-            for channelId in range(11):
+            for channelId in range(self.CHANNEL_COUNT):
                 commands += self._buildCommand(self.GET_CHANNEL_DIRECT, str(channelId))
         else:
             commands = self._buildCommand(self.GET_CHANNEL_DIRECT, str(channel))
         return commands
 
+    def reqSetChannels(self, values):
+        """Build one chained command setting several LED channels directly.
+
+        Args:
+            values: channel values indexed by channel id, None or negative
+                values leave the channel untouched.
+
+        Returns:
+            bytes: command
+
+        Raises:
+            ValueError: if a value does not fit CHANNEL_VALUE_DIGITS digits
+        """
+        maxValue = 10 ** self.CHANNEL_VALUE_DIGITS - 1
+        cmd = ''
+        for channel, value in enumerate(values[:self.CHANNEL_COUNT]):
+            if value is None or value < 0:
+                continue
+            if value > maxValue:
+                raise ValueError('Channel {:d} value {:d} exceeds {:d}'.format(channel, int(value), maxValue))
+            cmd += self.PREFIX + self.SET_CHANNEL_DIRECT + str(channel) + self._padInteger(int(value), self.CHANNEL_VALUE_DIGITS)
+        return self._buildCommand(cmd, skipPrefix=True)
+
     def reqGetManualModeState(self):
         return self._buildCommand(self.GET_MANUAL_MODE_ENABLED)
 
@@ -269,7 +416,48 @@ class HeavnOneProtocolHandler:
 
     def reqSetManualMode(self, manualMode: bool = False):
         return self._buildCommand(
-            self.COMMAND_MANUAL, 1 if manualMode else 0
+            self.COMMAND_MANUAL, '1' if manualMode else '0'
+        )
+
+    def reqSetAirQualityLED(self, enabled: bool = False):
+        return self._buildCommand(
+            self.SET_AIR_QUALITY_LED_ENABLED, '1' if enabled else '0'
+        )
+
+    def reqSetBluetoothAutoOff(self, enabled: bool = False):
+        return self._buildCommand(
+            self.SET_BLUETOOTH_AUTO_OFF_ENABLED, '1' if enabled else '0'
+        )
+
+    def reqSetGestureSensorsEnabled(self, enabled: bool = False):
+        return self._buildCommand(
+            self.SET_GESTURE_SENSORS_ENABLED, '1' if enabled else '0'
+        )
+
+    def reqSetCoworkingMode(self, enabled: bool = False):
+        return self._buildCommand(
+            self.SET_COWORKING_MODE_ENABLE, '1' if enabled else '0'
+        )
+
+    def reqSetCoworkingDefaultIntensity(self, intensity: int):
+        return self._buildCommand(
+            self.SET_COWORKING_DEFAULT_INTENSITY, self._padInteger(int(intensity), 3)
+        )
+
+    def reqSetPresence(self, enabled: bool, timeout: int):
+        """Build command to configure the presence detection
+
+        Sent in the format of the answer to reqGetPresence, e.g. 1:300.
+
+        Args:
+            enabled (bool): switch the light off when nobody is present
+            timeout (int): seconds without presence until it is switched off
+
+        Returns:
+            bytes: command
+        """
+        return self._buildCommand(
+            self.SET_PRESENCE, '{:s}:{:d}'.format('1' if enabled else '0', int(timeout))
         )
 
     def reqVideoMode(self):
@@ -281,28 +469,61 @@ class HeavnOneProtocolHandler:
         return self.reqManualScene(scene)
 
     def reqManualScene(self, scene):
-        cmd = ''
-        for s in range(0, self.SIDES):
+        cmd = b''
+        for s in range(len(self.SIDES)):
             temp = int(scene[(s * 2) + 1])
             intensity = int(scene[(s * 2) + 0])
-            cmd += self.PREFIX + self.COMMAND_SIDE_MANUAL_SET + self._padInteger(s, 2) + self._padInteger(intensity, 3) + self._padInteger(temp, 3)
+            cmd += self.reqManualSide(s, intensity, temp)
 
-        return self._buildCommand(cmd, skipPrefix=True) + self.reqSetManualMode(True)
+        return cmd + self.reqSetManualMode(True)
+
+    def reqManualSide(self, side: int, intensity: int, temperature: int):
+        """Build command to set a single side in manual mode
+
+        The lamp only applies it while manual mode is enabled.
+
+        Args:
+            side (int): side index (0 = up, 1 = bio, 2 = down)
+            intensity (int): intensity in percent
+            temperature (int): colour temperature
+
+        Returns:
+            bytes: command
+        """
+        return self._buildCommand(
+            self.COMMAND_SIDE_MANUAL_SET + self._padInteger(side, 2) + self._padInteger(int(intensity), 3) + self._padInteger(int(temperature), 3)
+        )
 
     def reqSetPreset(self, scene):
         cmd = ''
-        for s in range(0, self.SIDES):
+        for s in range(len(self.SIDES)):
             temp = int(scene[(s * 2) + 1])
             intensity = int(scene[(s * 2) + 0])
             cmd += self.PREFIX + self.SET_PRESET_DATA + '1' + str(s) + self._padInteger(intensity, 3) + self._padInteger(temp, 3)
 
         return self._buildCommand(cmd, skipPrefix=True) + self.reqSetManualMode(True)
 
+    def reqSetPresetSide(self, side: int, intensity: int, temperature: int):
+        """Build command to set a single side of the preset
+
+        Args:
+            side (int): side index (0 = up, 1 = bio, 2 = down)
+            intensity (int): intensity in percent
+            temperature (int): colour temperature
+
+        Returns:
+            bytes: command
+        """
+        return self._buildCommand(
+            self.SET_PRESET_DATA + '1' + str(side) + self._padInteger(int(intensity), 3) + self._padInteger(int(temperature), 3)
+        )
+
     def reqSetPresetName(self, sceneName: str):
         if not sceneName:
             logging.error("Missing scene name!")
             return None
 
+        self._checkName(sceneName)
         if len(sceneName) > 10:
             logging.warning("Scene name too long: {:s}".format(sceneName))
             sceneName = sceneName[:10]
@@ -323,9 +544,51 @@ class HeavnOneProtocolHandler:
             skipPrefix=True
         )
 
+    def reqGetPresetSide(self, side):
+        return self._buildCommand(self.GET_PRESET_DATA + '1' + str(side))
+
     def reqGetPresetName(self):
         return self._buildCommand(self.GET_PRESET_NAME + '1')
 
+    def splitFrames(self, payload: bytes, maxSize: int):
+        """Split a chained payload into writes of at most maxSize bytes
+
+        Payloads are only split in front of a command prefix, so the lamp
+        always receives whole commands. A single command longer than
+        maxSize is kept as one write.
+
+        Args:
+            payload (bytes): chained commands
+            maxSize (int): largest write, e.g. ATT MTU - 3
+
+        Returns:
+            list[bytes]: writes
+        """
+        if len(payload) <= maxSize:
+            return [payload]
+
+        prefix = self.PREFIX.encode('ascii')
+        writes = []
+        current = b''
+        for command in payload.split(prefix):
+            if not command:
+                continue
+            command = prefix + command
+            if current and len(current) + len(command) > maxSize:
+                writes.append(current)
+                current = b''
+            if len(command) > maxSize:
+                logging.warning('Command exceeds write size of {:d}: {:s}'.format(maxSize, str(command)))
+            current += command
+        if current:
+            writes.append(current)
+        return writes
+
+    def _checkName(self, name: str):
+        # chained payloads are split in front of every prefix, see splitFrames
+        if self.PREFIX in name:
+            raise ValueError('Names must not contain {:s}: {:s}'.format(self.PREFIX, name))
+
     def _buildCommand(self, cmd, parm=None, skipPrefix: bool = False):
         if not skipPrefix:
             cmd = self.PREFIX + cmd
@@ -381,33 +644,50 @@ class HeavnOneProtocolHandler:
         if cmd[1:3] == self.GET_CO2:
             return self.onCO2Received(cmd[3:])
         if cmd[1:4] == self.GET_METRICS_GET_CO2:
-            return self.onCO2Received(cmd[4:])
+            return self._onMetricsValue(self.onCO2Received(cmd[4:]))
         if cmd[1:3] == self.GET_CO2_ACCURACY:
             return self.onCO2AccuracyReceived(cmd[3:])
         if cmd[1:4] == self.GET_METRICS_GET_CO2_ACCURACY:
-            return self.onCO2AccuracyReceived(cmd[4:])
+            return self._onMetricsValue(self.onCO2AccuracyReceived(cmd[4:]))
         if cmd[1:3] == self.GET_HUMIDITY:
             return self.onHumidity(cmd[3:])
         if cmd[1:4] == self.GET_METRICS_GET_HUMIDITY:
-            return self.onHumidity(cmd[4:])
+            return self._onMetricsValue(self.onHumidity(cmd[4:]))
         if cmd[1:3] == self.GET_PRESSURE:
             return self.onPressure(cmd[3:])
         if cmd[1:4] == self.GET_METRICS_GET_PRESSURE:
-            return self.onPressure(cmd[4:])
+            return self._onMetricsValue(self.onPressure(cmd[4:]))
         if cmd[1:3] == self.GET_TEMPERATURE:
             return self.onTemperature(cmd[3:])
         if cmd[1:4] == self.GET_METRICS_GET_TEMPERATURE:
-            return self.onTemperature(cmd[4:])
+            return self._onMetricsValue(self.onTemperature(cmd[4:]))
+        if cmd[1:4] == self.GET_METRICS_GET_TIMESTAMP:
+            return self.onMetricsTimestamp(cmd[4:])
         if cmd[1:3] == self.GET_AIR_QUALITY_LED_ENABLED:
             return self.onAirQualityLEDReceived(cmd[3:])
         if cmd[1:3] == self.GET_LIGHT_SENSOR:
             return self.onLightSensor(cmd[3:])
+        if cmd[1:3] == self.GET_BLUETOOTH_AUTO_OFF_ENABLED:
+            return self.onBluetoothAutoOff(cmd[3:])
+        if cmd[1:3] == self.GET_GESTURE_SENSORS_ENABLED:
+            return self.onGestureSensorsEnabled(cmd[3:])
+        if cmd[1:3] == self.GET_COWORKING_DEFAULT_INTENSITY:
+            return self.onCoworkingDefaultIntensity(cmd[3:])
+        if cmd[1:3] == self.GET_COWORKING_MODE_ENABLE:
+            return self.onCoworkingMode(cmd[3:])
+        if cmd[1:3] == self.GET_FEATURE_ARRAY:
+            return self.onFeatureArray(cmd[3:])
+        if cmd[1:3] == self.GET_SYSTEM_CONFIGURATION:
+            return self.onSystemConfiguration(cmd[3:])
         if cmd[1] == self.GET_MANUAL_MODE_ENABLED:
             return self.onManualMode(cmd[2:])
         if cmd[1:3] == self.SET_PRESET_DATA:
             return self.onPresetData(cmd[3:])
+        if cmd[1:3] in [self.GET_PRESET_NAME, self.SET_PRESET_NAME]:
+            return self.onPresetName(cmd[3:])
 
         #raise Exception('Command unknown: {:s} / full: {:s}'.format(str(cmd[:2]), cmd))
+        self.unknownCommands += 1
         logging.error('Command unknown: {:s} / full: {:s}'.format(str(cmd[:2]), cmd))
         return None
 
@@ -418,7 +698,9 @@ class HeavnOneProtocolHandler:
         right = int(rightStr)
         bio = int(bioStr)
         left = int(leftStr)
-        self.onIntensityChanged(right, bio, left)
+        logging.debug('Intensity: {:d} / {:d} / {:d}'.format(right, bio, left))
+        # in the order of SIDES
+        return HeavnOneData(self.SET_INTENSITY, 'tuple', (left, bio, right))
 
     def onButtonStateReceived(self, value):
         # 1111
@@ -434,10 +716,13 @@ class HeavnOneProtocolHandler:
             butBioEnabled,
             butRightEnabled
         ))
+        # in the order of SIDES
+        return HeavnOneData(
+            self.GET_TOP_MID_BOT, 'tuple', (butLeftEnabled, butBioEnabled, butRightEnabled)
+        )
 
     def onVersion(self, value):
         logging.info('Firmware version: {:s}'.format(value))
-        self.firmwareVersion = value
         return HeavnOneData(self.GET_VERSION, 'str', value)
 
     def onHwVersion(self, value):
@@ -446,14 +731,10 @@ class HeavnOneProtocolHandler:
 
     def onName(self, value):
         logging.info('Lamp name: {:s}'.format(value))
-        self.name = value
-
         return HeavnOneData(self.GET_NAME, 'str', value)
 
     def onSerialNumber(self, value):
         logging.info('Serial number: {:s}'.format(value))
-        self.serialNumber = value
-
         return HeavnOneData(self.GET_SERIAL_NUMBER, 'str', value)
 
     def onCoffeeRelaxActivityReceived(self, value):
@@ -472,32 +753,45 @@ class HeavnOneProtocolHandler:
         logging.info('CoffeeRelaxActivity: {:d}:{:d} / {:d}'.format(
             coffeeStep, relaxStep, intensity
         ))
-        self.coffeeStep = coffeeStep
-        self.relaxStep = relaxStep
+        return HeavnOneData(
+            self.GET_COFFEE_RELAX_ACTIVITY, 'tuple', (coffeeStep, relaxStep, intensity)
+        )
 
     def onLatitudeReceived(self, value):
-        self.latitude = float(value[1:])
-        logging.info('Latitude received: {:f}'.format(self.latitude))
+        latitude = float(value[1:])
+        logging.info('Latitude received: {:f}'.format(latitude))
+        return HeavnOneData(self.GET_LATITUDE, 'float', latitude)
 
     def onLongitudeReceived(self, value):
-        self.longitude = float(value[1:])
-        logging.info('Longitude received: {:f}'.format(self.longitude))
+        longitude = float(value[1:])
+        logging.info('Longitude received: {:f}'.format(longitude))
+        return HeavnOneData(self.GET_LONGITUDE, 'float', longitude)
 
     def onPresenceReceived(self, value):
         presActive, presSeconds = value.split(':')
-        self.presenceEnabled = True if presActive == '1' else False
-        self.presenceTimeout = int(presSeconds)
+        presenceEnabled = True if presActive == '1' else False
+        presenceTimeout = int(presSeconds)
         logging.info('Presence received: {:s}, timeout: {:d}s'.format(
-            'enabled' if self.presenceEnabled else 'disabled',
-            self.presenceTimeout
+            'enabled' if presenceEnabled else 'disabled',
+            presenceTimeout
         ))
+        return HeavnOneData(
+            self.GET_PRESENCE, 'bool', presenceEnabled, {'timeout': presenceTimeout}
+        )
 
     def onSunCycleTimeReceived(self, value):
-        #return self.onUtcTimeReceived(value)
-        pass
+        # layout unknown, kept as sent
+        logging.info('Sun cycle time received: {:s}'.format(value))
+        return HeavnOneData(self.GET_SUN_CYCLE_TIME, 'str', value)
 
     def onUtcTimeReceived(self, value):
         """Time is provided as e.g. 20:29.06 which is in UTC"""
+        lightTime = self._timeOfDay(value)
+        logging.info('Current time on light: {time}'.format(time=lightTime))
+        return HeavnOneData(self.GET_UTC_TIME, 'datetime', lightTime)
+
+    def _timeOfDay(self, value):
+        """Return a UTC time of day, e.g. 20:29.06, on the nearest day."""
         utcTime = datetime.datetime.now(datetime.UTC)
         hour, minsec = value.split(':')
         minute, seconds = minsec.split('.')
@@ -510,8 +804,73 @@ class HeavnOneProtocolHandler:
             int(seconds),
             tzinfo=datetime.UTC
         )
-        logging.info('Current time on light: {time}'.format(time=lightTime))
-        return HeavnOneData(self.GET_UTC_TIME, 'datetime', lightTime)
+        # the lamp sends no date, around midnight it may be on the other day
+        if lightTime - utcTime > datetime.timedelta(hours=12):
+            lightTime -= datetime.timedelta(days=1)
+        elif utcTime - lightTime > datetime.timedelta(hours=12):
+            lightTime += datetime.timedelta(days=1)
+        return lightTime
+
+    def _parseDeviceTime(self, value):
+        """Return a time sent by the lamp, as epoch seconds or time of day.
+
+        Returns None for epoch seconds that are not a date, e.g. relative
+        to the start of the lamp.
+        """
+        if ':' in value:
+            return self._timeOfDay(value)
+        seconds = int(value)
+        if seconds < self.MIN_DEVICE_EPOCH:
+            return None
+        return datetime.datetime.fromtimestamp(seconds, datetime.UTC)
+
+    def _onMetricsValue(self, dataPoint):
+        """Keep an answer of reqGetMetrics until its frame is complete.
+
+        Returns:
+            HeavnOneData: a frame completed without timestamp, otherwise None
+        """
+        frame = None
+        if dataPoint.cmd in self._metricsFrame:
+            # the previous frame ended without timestamp
+            self.metricsWithoutTimestamp = True
+            frame = self._completeMetricsFrame(None)
+        self._metricsFrame[dataPoint.cmd] = dataPoint
+        if (
+            frame is None
+            and self.metricsWithoutTimestamp
+            and len(self._metricsFrame) == len(self.METRICS_READINGS)
+        ):
+            frame = self._completeMetricsFrame(None)
+        return frame
+
+    def onMetricsTimestamp(self, value):
+        """Complete the metrics frame, the timestamp is its last answer.
+
+        A missing or unusable timestamp is replaced by the receive time.
+
+        Returns:
+            HeavnOneData: all readings of the frame by command type, the
+                sample time in the attributes
+        """
+        try:
+            sampleTime = self._parseDeviceTime(value)
+        except (ValueError, OverflowError, OSError):
+            logging.warning('Unusable metrics timestamp: {:s}'.format(value))
+            sampleTime = None
+        if not self._metricsFrame:
+            # the frame was completed without waiting for the timestamp
+            self.metricsWithoutTimestamp = False
+            return None
+        return self._completeMetricsFrame(sampleTime)
+
+    def _completeMetricsFrame(self, sampleTime):
+        frame, self._metricsFrame = self._metricsFrame, {}
+        if sampleTime is None:
+            self.incompleteFrames += 1
+            sampleTime = datetime.datetime.now(datetime.UTC)
+        logging.debug('Metrics frame at {time}: {count:d} values'.format(time=sampleTime, count=len(frame)))
+        return HeavnOneData(self.GET_METRICS_GET, 'frame', frame, {'sample_time': sampleTime})
 
     def onSunDownAndDawnReceived(self, value):
         """
@@ -522,78 +881,37 @@ class HeavnOneProtocolHandler:
         dawnHour, dawnMinute = dawn.split(':')
         downHour, downMinute = down.split(':')
         dtDawn = datetime.datetime.now()
-        self.sunDawn = dtDawn.replace(
+        sunDawn = dtDawn.replace(
             hour=int(dawnHour), minute=int(dawnMinute), second=0
         )
         dtDown = datetime.datetime.now()
-        self.sunDown = dtDown.replace(
+        sunDown = dtDown.replace(
             hour=int(downHour), minute=int(downMinute), second=0
         )
         logging.info('Sun dawn/down received: {:s} - {:s}'.format(
-            self.sunDawn.strftime('%Y-%m-%d %H:%M:%S'),
-            self.sunDown.strftime('%Y-%m-%d %H:%M:%S')
+            sunDawn.strftime('%Y-%m-%d %H:%M:%S'),
+            sunDown.strftime('%Y-%m-%d %H:%M:%S')
         ))
+        return HeavnOneData(self.GET_SUN_DOWN_AND_DAWN, 'tuple', (sunDawn, sunDown))
 
     def onUtcOffsetReceived(self, value):
-        self.utcOffset = int(value)
-        logging.info('UTC offset received: {:d}'.format(self.utcOffset))
+        # negative offsets are sent as offset + 24 (cf. reqSetUtcOffset)
+        utcOffset = int(value)
+        utcOffset = utcOffset - 24 if utcOffset > 12 else utcOffset
+        logging.info('UTC offset received: {:d}'.format(utcOffset))
+        return HeavnOneData(self.GET_UTC_OFFSET, 'int', utcOffset)
 
     def onChannelDirectReceived(self, value):
-        subI8 = int(value[0:1])
-        subI9 = int(value[1:])
-        if subI8 == 0:
-            self.onChannelTopWWReceived(subI9)
-        elif subI8 == 1:
-            self.onChannelTopNWReceived(subI9)
-        elif subI8 == 2:
-            self.onChannelTopCWReceived(subI9)
-        elif subI8 == 3:
-            self.onChannelMidWWReceived(subI9)
-        elif subI8 == 4:
-            self.onChannelMidCWReceived(subI9)
-        elif subI8 == 5:
-            self.onChannelMidBlueReceived(subI9)
-        elif subI8 == 6:
-            self.onChannelBotWWReceived(subI9)
-        elif subI8 == 7:
-            self.onChannelBotNWReceived(subI9)
-        elif subI8 == 8:
-            self.onChannelBotCWReceived(subI9)
-        else:
-            raise Exception('Unknown channel: {:s}'.format(str(value)))
-
-    def onChannelTopWWReceived(self, value):
-        logging.debug('Channel Top-WW: {:d}'.format(value))
-
-    def onChannelTopNWReceived(self, value):
-        logging.debug('Channel Top-NW: {:d}'.format(value))
-
-    def onChannelTopCWReceived(self, value):
-        logging.debug('Channel Top-CW: {:d}'.format(value))
-
-    def onChannelMidWWReceived(self, value):
-        logging.debug('Channel Mid-WW: {:d}'.format(value))
-
-    def onChannelMidCWReceived(self, value):
-        logging.debug('Channel Mid-CW: {:d}'.format(value))
-
-    def onChannelMidBlueReceived(self, value):
-        logging.debug('Channel Mid-Blue{:d}: '.format(value))
-
-    def onChannelBotWWReceived(self, value):
-        logging.debug('Channel Bot-WW: {:d}'.format(value))
-
-    def onChannelBotNWReceived(self, value):
-        logging.debug('Channel Bot-NW: {:d}'.format(value))
-
-    def onChannelBotCWReceived(self, value):
-        logging.debug('Channel Bot-CW: {:d}'.format(value))
+        # Example: 3100 = channel 3, value 100
+        channel = int(value[0:1])
+        channelValue = int(value[1:])
+        if channel >= self.CHANNEL_COUNT:
+            logging.warning('Unknown channel: {:s}'.format(str(value)))
+            return None
 
-    def onIntensityChanged(self, right, bio, left):
-        logging.debug('Intensity: {:d} / {:d} / {:d}'.format(right, bio, left))
-        self.intensityLeft = left
-        self.intensityBio = bio
-        self.intensityRight = right
+        self.channels[channel] = channelValue
+        logging.debug('Channel {:s}: {:d}'.format(self.CHANNEL_NAMES[channel], channelValue))
+        return HeavnOneData(self.channelCommand(channel), 'int', channelValue)
 
     def onCO2Received(self, value):
         # BME680 - it will give relative values!
@@ -639,6 +957,40 @@ class HeavnOneProtocolHandler:
         logging.debug('Light sensor value read: {:.2f}'.format(floatValue))
         return HeavnOneData(self.GET_LIGHT_SENSOR, 'float', floatValue)
 
+    def onBluetoothAutoOff(self, value):
+        # Example: 0 = false, 1 = true
+        intVal = int(value)
+        logging.debug('Bluetooth auto off value read: {:d}'.format(intVal))
+        return HeavnOneData(self.GET_BLUETOOTH_AUTO_OFF_ENABLED, 'bool', intVal == 1)
+
+    def onGestureSensorsEnabled(self, value):
+        # Example: 0 = false, 1 = true
+        intVal = int(value)
+        logging.debug('Gesture sensors value read: {:d}'.format(intVal))
+        return HeavnOneData(self.GET_GESTURE_SENSORS_ENABLED, 'bool', intVal == 1)
+
+    def onCoworkingDefaultIntensity(self, value):
+        # Example: 080
+        intVal = int(value)
+        logging.debug('Coworking default intensity read: {:d}'.format(intVal))
+        return HeavnOneData(self.GET_COWORKING_DEFAULT_INTENSITY, 'int', intVal)
+
+    def onCoworkingMode(self, value):
+        # Example: 0 = false, 1 = true
+        intVal = int(value)
+        logging.debug('Coworking mode value read: {:d}'.format(intVal))
+        return HeavnOneData(self.GET_COWORKING_MODE_ENABLE, 'bool', intVal == 1)
+
+    def onFeatureArray(self, value):
+        # layout unknown, kept as sent
+        logging.info('Feature array: {:s}'.format(value))
+        return HeavnOneData(self.GET_FEATURE_ARRAY, 'str', value)
+
+    def onSystemConfiguration(self, value):
+        # layout unknown, kept as sent
+        logging.info('System configuration: {:s}'.format(value))
+        return HeavnOneData(self.GET_SYSTEM_CONFIGURATION, 'str', value)
+
     def onManualMode(self, value):
         # Example: 0 = false, 1 = true
         intVal = int(value)
@@ -658,3 +1010,12 @@ class HeavnOneProtocolHandler:
         logging.debug('Preset data received for {:s}: intensity = {:d}, temperature = {:d}'.format(
             sideName, intensity, temperature)
         )
+        return HeavnOneData(self.presetSideCommand(side), 'tuple', (intensity, temperature))
+
+    def onPresetName(self, value):
+        # Example: 1Office
+        #          ^ fix
+        #           ^^^^^^^^^^ name, padded with spaces
+        name = value[1:].rstrip()
+        logging.debug('Preset name received: {:s}'.format(name))
+        return HeavnOneData(self.GET_PRESET_NAME, 'str', name)
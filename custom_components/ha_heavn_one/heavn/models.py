@@ -3,16 +3,35 @@ from __future__ import annotations
 import asyncio
 import contextlib
 import dataclasses
+import datetime
 import logging
-from typing import Any, Callable, Tuple, TypeVar, cast
+import time
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Tuple, TypeVar, cast
 import uuid
 
 from bleak import BleakClient, BleakError
-from bleak.backends.device import BLEDevice
-from bleak.backends.scanner import AdvertisementData
-from bleak_retry_connector import establish_connection
 
-from .handler import HeavnOneProtocolHandler
+from .aggregate import MetricAggregator
+from .calibration import calibration_table
+from .capabilities import OPTIONAL_COMMANDS, Capabilities
+from .capture import INCOMING, OUTGOING, CaptureWriter
+from .clock import CLOCK_SYNC_MIN_INTERVAL, ClockSync, next_offset_change
+from .config import ConfigManager
+from .daylight import DaylightController
+from .filters import FILTER_NONE, FilterChain, SpikeFilter
+from .handler import HeavnOneData, HeavnOneProtocolHandler, InvalidProtocolData
+from .presence import PresenceTracker
+from .presets import Preset, PresetManager
+from .solar import SolarDay, solar_day
+from .state import StateStore
+from .stats import HeavnOneStatistics
+from .stream import DEFAULT_STREAM_SIZE, OVERFLOW_DROP_OLDEST, DataPointStream
+from .trace import DISPATCHED, PARSED, STATE_WRITTEN, Tracer
+from .transition import TransitionEngine
+
+if TYPE_CHECKING:
+    from bleak.backends.device import BLEDevice
+    from bleak.backends.scanner import AdvertisementData
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -34,6 +53,42 @@ class BleakInvalidDevice(BleakError):
 UART_WRITE_UUID = "6e400002-b5a3-f393-e0a9-e50e24dcca9e"
 UART_READ_UUID = "6e400003-b5a3-f393-e0a9-e50e24dcca9e"
 
+# Default ATT MTU and the ATT header taking three bytes of each write.
+DEFAULT_MTU = 23
+ATT_HEADER_SIZE = 3
+# Seconds to wait for the answer to a targeted read.
+QUERY_TIMEOUT = 5.0
+# Seconds between two metric polls.
+METRICS_INTERVAL = 10
+# Number of metric polls between two bulk reads of the LED channels.
+CHANNELS_POLL_CYCLES = 30
+# Seconds between two poll windows in on-demand mode.
+ON_DEMAND_POLL_INTERVAL = 60
+# Seconds without traffic after which an on-demand connection is closed.
+IDLE_TIMEOUT = 3.0
+# Seconds a connection may take, added to the query timeout while disconnected.
+CONNECT_TIMEOUT = 20.0
+# Seconds to wait before reconnecting, doubled after every failed attempt.
+RECONNECT_DELAY = 5
+RECONNECT_MAX_DELAY = 300
+# Minutes the lamp's sun times may differ from the computed ones.
+SUN_TIME_TOLERANCE = 10
+# Seconds a reported setting is trusted before reconciling it.
+CONFIG_MAX_AGE = 60
+# Readings which may be downsampled before they reach the entities.
+AGGREGATED_COMMANDS = (
+    HeavnOneProtocolHandler.GET_CO2,
+    HeavnOneProtocolHandler.GET_HUMIDITY,
+    HeavnOneProtocolHandler.GET_PRESSURE,
+    HeavnOneProtocolHandler.GET_TEMPERATURE,
+)
+# Largest change of a reading between two polls accepted without confirmation.
+SPIKE_LIMITS = {
+    HeavnOneProtocolHandler.GET_CO2: 50.0,
+    HeavnOneProtocolHandler.GET_HUMIDITY: 5.0,
+    HeavnOneProtocolHandler.GET_TEMPERATURE: 2.0,
+}
+
 
 @dataclasses.dataclass
 class HeavnOneDevice:
@@ -51,7 +106,45 @@ class HeavnOneDevice:
     def __init__(self):
         self._handler = HeavnOneProtocolHandler()
         self._send_queue = asyncio.Queue()
-        self._callbacks = {}
+        self._callbacks: dict[str, list[Callable[[HeavnOneData], None]]] = {}
+        self._streams: list[DataPointStream] = []
+        self._waiters: dict[str, list[asyncio.Future]] = {}
+        self._client = None
+        self._max_write = DEFAULT_MTU - ATT_HEADER_SIZE
+        self._aggregator: MetricAggregator | None = None
+        self._filters: dict[str, FilterChain] = {}
+        self.clock = ClockSync()
+        self._unrepresentable_offset: datetime.timedelta | None = None
+        # last reported value of every field, read through on demand
+        self.state = StateStore(self._handler, self.query, self.query_chained)
+        self.presets = PresetManager(self._handler, self.state)
+        self.config = ConfigManager(self._handler, self.state)
+        self.capabilities = Capabilities()
+        # capabilities by firmware, kept by the caller across restarts
+        self.capability_cache: dict[str, dict] = {}
+        # called after the capability cache changed, e.g. to store it
+        self.capabilities_changed: Callable[[], None] | None = None
+        self.transitions = TransitionEngine(self)
+        # time zone the lamp clock is kept in, None uses the system time zone
+        self.timezone: datetime.tzinfo | None = None
+        self._capture: CaptureWriter | None = None
+        self.tracer: Tracer | None = None
+        self.daylight: DaylightController | None = None
+        self.stats = HeavnOneStatistics()
+        self.presence = PresenceTracker()
+        self._ble_device: BLEDevice | None = None
+        # connect only for poll windows and queued commands
+        self.on_demand = False
+        self.poll_interval = ON_DEMAND_POLL_INTERVAL
+        self.idle_timeout = IDLE_TIMEOUT
+        self._auto_off_hinted = False
+        # lamp time of the last metrics frame
+        self.last_sample_time: datetime.datetime | None = None
+        self._wake = asyncio.Event()
+        # set while the lamp is not connected
+        self._disconnected = asyncio.Event()
+        self._disconnected.set()
+        self._last_activity = 0.0
         self.uuid = uuid.uuid4()
         _LOGGER.debug(f'(%s) New device object created: {str(self.uuid)}', self.address)
 
@@ -59,6 +152,95 @@ class HeavnOneDevice:
     def handler(self):
         return self._handler
 
+    @property
+    def latitude(self) -> float | None:
+        """Return the latitude configured on the lamp."""
+        return self._reported(self._handler.GET_LATITUDE)
+
+    @property
+    def longitude(self) -> float | None:
+        """Return the longitude configured on the lamp."""
+        return self._reported(self._handler.GET_LONGITUDE)
+
+    @property
+    def bluetooth_auto_off(self) -> bool | None:
+        """Return if the lamp's Bluetooth auto off is enabled."""
+        return self._reported(self._handler.GET_BLUETOOTH_AUTO_OFF_ENABLED)
+
+    def _reported(self, field: str) -> Any:
+        state = self.state.peek(field)
+        return state.value if state is not None else None
+
+    @property
+    def channels(self) -> list[int | None]:
+        """Return the last known value of every LED channel (None if unknown)."""
+        return [
+            None if value == self._handler.CHANNEL_UNKNOWN else value
+            for value in self._handler.channels
+        ]
+
+    def set_channels(self, values: list[int | None]) -> None:
+        """Set several LED channels in one chained write and read them back."""
+        self.queue_send(self._handler.reqSetChannels(values))
+        self.queue_send(self._handler.reqGetAllChannels())
+
+    def set_tracing(self, enabled: bool) -> None:
+        """Trace the latency of writes and notifications."""
+        if not enabled:
+            self.tracer = None
+        elif self.tracer is None:
+            self.tracer = Tracer(self.address)
+
+    def set_daylight_target(self, target: float, sides: tuple[int, ...] = (0, 1, 2)) -> None:
+        """Keep the ambient light at a target (0 disables the controller).
+
+        Takes effect on the next connection.
+        """
+        self.daylight = DaylightController(self, target, sides) if target > 0 else None
+
+    def set_aggregation_window(self, window: float) -> None:
+        """Publish readings as aggregates once per window (0 disables it)."""
+        self._aggregator = MetricAggregator(window, AGGREGATED_COMMANDS) if window > 0 else None
+
+    def set_filter(self, cmdtype: str, smoothing: str, spike_rejection: bool = False) -> None:
+        """Filter a BME680 reading before it is aggregated and published."""
+        spike = None
+        if spike_rejection and cmdtype in SPIKE_LIMITS:
+            spike = SpikeFilter(SPIKE_LIMITS[cmdtype])
+        if smoothing == FILTER_NONE and spike is None:
+            self._filters.pop(cmdtype, None)
+        else:
+            self._filters[cmdtype] = FilterChain(smoothing, spike)
+
+    async def start_capture(self, path: str) -> None:
+        """Append all outgoing payloads and notifications to a capture file."""
+        await self.stop_capture()
+        self._capture = await asyncio.get_running_loop().run_in_executor(None, CaptureWriter, path)
+        _LOGGER.info("(%s) Capturing BLE traffic to %s", self.address, path)
+
+    async def stop_capture(self) -> None:
+        """Stop capturing and close the capture file."""
+        capture, self._capture = self._capture, None
+        if capture is not None:
+            await asyncio.get_running_loop().run_in_executor(None, capture.close)
+
+    def set_channel_control(self, enabled: bool) -> None:
+        """Drive light frames per LED channel instead of per side.
+
+        The channel values come from an approximate mapping, see
+        calibration.py.
+        """
+        if enabled:
+            self.transitions.frame_func = calibration_table().frame
+        else:
+            self.transitions.frame_func = self._handler.reqManualSide
+
+    def record_manual_side(self, side: int, intensity: int, temperature: int) -> None:
+        """Publish a manual side setting written to the lamp."""
+        self._dispatch(
+            HeavnOneData(self._handler.manualSideCommand(side), 'tuple', (intensity, temperature))
+        )
+
     def poll_needed(self, last_poll_time: float | None) -> bool:
         """Return if poll is needed."""
         return False
@@ -66,39 +248,289 @@ class HeavnOneDevice:
     def handle_notify(self, handle: int, data: bytearray) -> None:
         """Helper for command events."""
 
-        dataPoint = self._handler.handleResponse(data)
-        if dataPoint is not None:
-            with contextlib.suppress(KeyError):
-                self._callbacks[dataPoint.cmd](dataPoint)
+        self.stats.notifications_received += 1
+        received = self._last_activity = time.monotonic()
+        tracer = self.tracer
+        if tracer is not None:
+            tracer.begin(received)
+        if self._capture is not None:
+            self._capture.write(INCOMING, data)
+        try:
+            dataPoint = self._handler.handleResponse(data)
+        except (InvalidProtocolData, ValueError, IndexError, UnicodeDecodeError) as ex:
+            self.stats.parse_failures += 1
+            _LOGGER.warning("(%s) Could not parse %s: %s", self.address, data, ex)
+            return
+        finally:
+            self.stats.unknown_commands = self._handler.unknownCommands
+            self.stats.incomplete_frames = self._handler.incompleteFrames
+
+        if tracer is not None:
+            tracer.mark(PARSED)
+        if dataPoint is None:
+            return
+        if dataPoint.cmd == self._handler.GET_METRICS_GET:
+            # the readings of a frame reach the entities in one go
+            self.stats.metrics_frames += 1
+            self.last_sample_time = dataPoint.attributes['sample_time']
+            # the accuracy filters the CO2 reading of the same frame
+            readings = sorted(
+                dataPoint.dataValue.values(),
+                key=lambda reading: reading.cmd != self._handler.GET_CO2_ACCURACY,
+            )
+            for reading in readings:
+                self._dispatch(reading)
+            # subscribers of GET_METRICS_GET get the stamped snapshot
+            for stream in self._streams:
+                stream.put(dataPoint)
+            self._resolve_waiters(dataPoint)
+        else:
+            self._dispatch(dataPoint)
+            _LOGGER.debug("Got data: {:s}".format(str(dataPoint)))
+        if tracer is not None:
+            tracer.end(dataPoint.cmd)
+
+    def _dispatch(self, dataPoint: HeavnOneData) -> None:
+        """Hand a data point to the subscribers and update the device state."""
+        for stream in self._streams:
+            stream.put(dataPoint)
+        self.state.update(dataPoint)
+        self._publish(dataPoint)
+        self._resolve_waiters(dataPoint)
+
+        # specific data should be updated directly here.
+        if dataPoint.cmd == self._handler.GET_NAME:
+            self.name = dataPoint.dataValue
+        elif dataPoint.cmd == self._handler.GET_SERIAL_NUMBER:
+            self.serial_number = dataPoint.dataValue
+        elif dataPoint.cmd == self._handler.GET_VERSION:
+            self.sw_version = dataPoint.dataValue
+        elif dataPoint.cmd == self._handler.GET_MAIN_PCB_FIRMWARE_VERSION:
+            self.hw_version = dataPoint.dataValue
+        elif dataPoint.cmd == self._handler.GET_SUN_DOWN_AND_DAWN:
+            self._check_sun_times(*dataPoint.dataValue)
+        elif dataPoint.cmd == self._handler.GET_BLUETOOTH_AUTO_OFF_ENABLED:
+            self._on_bluetooth_auto_off(dataPoint.dataValue)
+
+    def _resolve_waiters(self, dataPoint: HeavnOneData) -> None:
+        for future in self._waiters.pop(dataPoint.cmd, []):
+            if not future.done():
+                future.set_result(dataPoint)
+
+    def _publish(self, dataPoint: HeavnOneData) -> None:
+        """Pass a data point through the processing stages to the entities."""
+        chain = self._filters.get(dataPoint.cmd)
+        if chain is not None:
+            # frames dispatch the accuracy before the CO2 reading
+            accuracy = (
+                self._reported(self._handler.GET_CO2_ACCURACY)
+                if dataPoint.cmd == self._handler.GET_CO2 else None
+            )
+            dataPoint = chain.update(dataPoint, accuracy)
+            if dataPoint is None:
+                return
+
+        if self._aggregator is not None:
+            dataPoint = self._aggregator.add(dataPoint)
+            if dataPoint is None:
+                return
+
+        callbacks = self._callbacks.get(dataPoint.cmd, ())
+        if callbacks and self.tracer is not None:
+            self.tracer.mark(DISPATCHED, first=True)
+        for callback in callbacks:
+            callback(dataPoint)
+        if callbacks and self.tracer is not None:
+            # the entity callbacks write their state synchronously
+            self.tracer.mark(STATE_WRITTEN)
+
+    def stream(
+        self,
+        commands: Iterable[str] | None = None,
+        maxsize: int = DEFAULT_STREAM_SIZE,
+        overflow: str = OVERFLOW_DROP_OLDEST,
+    ) -> DataPointStream:
+        """Subscribe to the raw data points, before filters and aggregation.
+
+        Args:
+            commands: command types to receive, None for all
+            maxsize: bound of the subscriber queue
+            overflow: what to drop when the queue is full, see DataPointStream
+
+        Returns:
+            DataPointStream: async iterator, close it to unsubscribe
+        """
+        stream = DataPointStream(commands, maxsize, overflow, self._close_stream)
+        self._streams = [*self._streams, stream]
+        return stream
+
+    def _close_stream(self, stream: DataPointStream) -> None:
+        self._streams = [s for s in self._streams if s is not stream]
+
+    def register_sensor_callback(self, cmdtype: str, callback) -> Callable[[], None]:
+        """Call back with every published data point of a command type.
+
+        Returns:
+            function removing the callback again
+        """
+        self._callbacks[cmdtype] = [*self._callbacks.get(cmdtype, ()), callback]
+
+        def remove() -> None:
+            self._callbacks[cmdtype] = [c for c in self._callbacks[cmdtype] if c is not callback]
+
+        return remove
 
-            # specific data should be updated directly here.
-            if dataPoint.cmd == self._handler.GET_NAME:
-                self.name = dataPoint.dataValue
-            elif dataPoint.cmd == self._handler.GET_SERIAL_NUMBER:
-                self.serial_number = dataPoint.dataValue
-            elif dataPoint.cmd == self._handler.GET_VERSION:
-                self.sw_version = dataPoint.dataValue
-            elif dataPoint.cmd == self._handler.GET_MAIN_PCB_FIRMWARE_VERSION:
-                self.hw_version = dataPoint.dataValue
+    async def query(
+        self, request: bytes, cmdtype: str, timeout: float = QUERY_TIMEOUT
+    ) -> HeavnOneData | None:
+        """Send a request and wait for the data point answering it.
+
+        Returns None if the lamp did not answer within the timeout. In
+        on-demand mode the time to connect is added while disconnected.
+        """
+        if self.on_demand and not self.stats.connected:
+            timeout += CONNECT_TIMEOUT
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(cmdtype, []).append(future)
+        self.queue_send(request)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            _LOGGER.debug("(%s) No answer for %s within %.1fs", self.address, cmdtype, timeout)
+            return None
+        finally:
+            with contextlib.suppress(KeyError, ValueError):
+                self._waiters[cmdtype].remove(future)
+
+    async def query_chained(
+        self, request: bytes, cmdtypes: Iterable[str], timeout: float = QUERY_TIMEOUT
+    ) -> dict[str, HeavnOneData | None]:
+        """Send one chained request and wait for the answers of several command types.
+
+        Returns the data point by command type, None for those the lamp did
+        not answer within the timeout.
+        """
+        if self.on_demand and not self.stats.connected:
+            timeout += CONNECT_TIMEOUT
+        loop = asyncio.get_running_loop()
+        futures = {cmdtype: loop.create_future() for cmdtype in cmdtypes}
+        for cmdtype, future in futures.items():
+            self._waiters.setdefault(cmdtype, []).append(future)
+        self.queue_send(request)
+        try:
+            await asyncio.wait(futures.values(), timeout=timeout)
+        finally:
+            for cmdtype, future in futures.items():
+                with contextlib.suppress(KeyError, ValueError):
+                    self._waiters[cmdtype].remove(future)
+        return {
+            cmdtype: future.result() if future.done() and not future.cancelled() else None
+            for cmdtype, future in futures.items()
+        }
 
-        _LOGGER.debug("Got data: {:s}".format(str(dataPoint)))
+    async def write_and_confirm(
+        self, write: bytes, read: bytes, cmdtype: str, timeout: float = QUERY_TIMEOUT
+    ) -> HeavnOneData | None:
+        """Write a setting, then read it back with a targeted read.
 
-    def register_sensor_callback(self, cmdtype: str, callback) -> None:
-        self._callbacks[cmdtype] = callback
+        The lamp does not acknowledge writes, so the read-back is the only way
+        to know whether the setting was applied. The read is only queued once
+        the write completed, so the answer to a poll sent before the write
+        cannot be taken as the confirmation. Returns the value the lamp
+        reported or None if the write failed or the lamp did not answer.
+        """
+        writeTimeout = timeout + (CONNECT_TIMEOUT if self.on_demand and not self.stats.connected else 0)
+        try:
+            await asyncio.wait_for(self.write(write), writeTimeout)
+        except asyncio.TimeoutError:
+            _LOGGER.debug("(%s) Write of %s not sent within %.1fs", self.address, cmdtype, writeTimeout)
+            return None
+        except BleakError as ex:
+            _LOGGER.debug("(%s) Write of %s failed: %s", self.address, cmdtype, ex)
+            return None
+        return await self.query(read, cmdtype, timeout)
 
     async def connect(self, device: BLEDevice) -> None:
+        # imported on first use, it is only needed once a lamp is connected
+        from bleak_retry_connector import establish_connection
+
+        self._ble_device = device
         self._client = await establish_connection(BleakClient, device, self.address, disconnected_callback=self.handle_disconnect)
+        self._disconnected.clear()
+        self.stats.on_connected()
+        await self._negotiate_mtu()
         await self._client.start_notify(UART_READ_UUID, self.handle_notify)
 
+    async def _negotiate_mtu(self) -> None:
+        """Determine the largest write, asking for a larger MTU where possible."""
+        # bleak's BlueZ backend (BleakClientBlueZDBus) only exchanges the MTU
+        # when its private _acquire_mtu() is called, other backends (e.g.
+        # ESPHome proxies) negotiate it while connecting and lack the method.
+        backend = getattr(self._client, "_backend", None)
+        if backend is not None and hasattr(backend, "_acquire_mtu"):
+            with contextlib.suppress(Exception):
+                await backend._acquire_mtu()
+        mtu = getattr(self._client, "mtu_size", None) or DEFAULT_MTU
+        self._max_write = max(mtu, DEFAULT_MTU) - ATT_HEADER_SIZE
+        _LOGGER.debug("(%s) MTU %d, writing up to %d bytes", self.address, mtu, self._max_write)
+
     async def _check_complete(self):
         while not self.name or not self.serial_number or not self.hw_version or not self.sw_version:
             await asyncio.sleep(1)
 
+    @property
+    def firmware_key(self) -> str:
+        """Return the key of the capability cache."""
+        return f'{self.sw_version}/{self.hw_version}'
+
+    async def discover_capabilities(self, force: bool = False) -> bool:
+        """Take the capabilities from the cache and probe what is not settled.
+
+        Expired capabilities are probed in full, otherwise only the commands
+        that went unanswered on earlier connections are asked again.
+
+        Args:
+            force: forget the cached capabilities and probe in full
+
+        Returns:
+            bool: True if the lamp was probed and the cache updated
+        """
+        cached = self.capability_cache.get(self.firmware_key)
+        capabilities = (
+            Capabilities.from_dict(cached) if cached is not None and not force else Capabilities()
+        )
+        if capabilities.expired():
+            commands = OPTIONAL_COMMANDS
+        elif capabilities.pending:
+            commands = capabilities.pending
+        else:
+            self.capabilities = capabilities
+            return False
+
+        answered = await capabilities.probe(self._handler, self.query, commands)
+        if not answered:
+            # most likely the connection was lost
+            _LOGGER.warning('(%s) Capability probe unanswered, keeping the known capabilities', self.address)
+            if cached is not None:
+                self.capabilities = Capabilities.from_dict(cached)
+            return False
+        self.capabilities = capabilities
+        self.capability_cache[self.firmware_key] = capabilities.as_dict()
+        _LOGGER.info('(%s) Capabilities of firmware %s: %s', self.address, self.firmware_key, capabilities.as_dict())
+        if self.capabilities_changed is not None:
+            self.capabilities_changed()
+        return True
+
+    async def _collect_info(self):
+        await self._check_complete()
+        await self.discover_capabilities()
+
     async def collect_device_info(self):
         self.queue_send(self._handler.reqVersion())
         self.queue_send(self._handler.reqName())
         self.queue_send(self._handler.reqSerialNumber())
         self.queue_send(self._handler.reqHwVersion())
+        main_tasks = set()
         self._loop = asyncio.get_event_loop()
         loop = asyncio.get_event_loop()
         loop.set_exception_handler(self.excp_handler)
@@ -107,7 +539,7 @@ class HeavnOneDevice:
             main_tasks = {
                 asyncio.create_task(self.send_loop()),
                 asyncio.create_task(self.check_loop()),
-                asyncio.create_task(self._check_complete())
+                asyncio.create_task(self._collect_info())
             }
 
             done, pending = await asyncio.wait(main_tasks, return_when=asyncio.FIRST_COMPLETED)
@@ -121,27 +553,247 @@ class HeavnOneDevice:
             _LOGGER.exception(e)
         finally:
             _LOGGER.warning('Shutdown initiated')
+            for task in main_tasks:
+                task.cancel()
             _LOGGER.info('Shutdown complete.')
             await self.disconnect()
 
     async def _collect_metrics(self):
         # on first connection, ask for a bunch of data....
-        self.queue_send(self._handler.reqButtonStates())
-        self.queue_send(self._handler.reqGetSunCycleTime())
-        self.queue_send(self._handler.reqGetSunDownAndDawn())
-        self.queue_send(self._handler.reqCoffeeRelaxActivity())
-        self.queue_send(self._handler.reqVersion())
-        self.queue_send(self._handler.reqName())
-        self.queue_send(self._handler.reqSerialNumber())
-        self.queue_send(self._handler.reqHwVersion())
-        self.queue_send(self._handler.reqUtcTime())
-        self.queue_send(self._handler.reqGetManualModeState())
+        self._queue_initial_requests()
+        cycle = 0
         while True:
-            self.queue_send(self._handler.reqGetMetrics())
-            self.queue_send(self._handler.reqAirQualityLED())
-            await asyncio.sleep(10)
+            self._queue_poll(cycle)
+            if cycle == 0:
+                await self._probe_pending()
+            cycle += 1
+            await asyncio.sleep(METRICS_INTERVAL)
+
+    async def _probe_pending(self) -> None:
+        """Ask again for the commands unanswered on earlier connections."""
+        if self.capabilities.probed is not None and self.capabilities.pending:
+            await self.discover_capabilities()
+
+    def _queue_initial_requests(self) -> None:
+        handler = self._handler
+        self._poll(handler.GET_TOP_MID_BOT, handler.reqButtonStates())
+        # sun times are computed locally, the lamp is only asked once to check them
+        self._poll(handler.GET_LATITUDE, handler.reqGetLocation())
+        self._poll(handler.GET_SUN_DOWN_AND_DAWN, handler.reqGetSunDownAndDawn())
+        self.queue_send(handler.reqCoffeeRelaxActivity())
+        self.queue_send(handler.reqVersion())
+        self.queue_send(handler.reqName())
+        self.queue_send(handler.reqSerialNumber())
+        self.queue_send(handler.reqHwVersion())
+        self._poll(handler.GET_MANUAL_MODE_ENABLED, handler.reqGetManualModeState())
+        self._poll(handler.GET_BLUETOOTH_AUTO_OFF_ENABLED, handler.reqBluetoothAutoOff())
+
+    def _queue_poll(self, cycle: int) -> None:
+        handler = self._handler
+        self.queue_send(handler.reqGetMetrics())
+        self._poll(handler.GET_AIR_QUALITY_LED_ENABLED, handler.reqAirQualityLED())
+        if cycle % CHANNELS_POLL_CYCLES == 0:
+            # all channels in a single chained read
+            self._poll(handler.channelCommand(0), handler.reqGetAllChannels())
+
+    def _poll(self, cmdtype: str, request: bytes) -> None:
+        """Queue a request unless the lamp is known not to answer it."""
+        if self.capabilities.is_supported(cmdtype):
+            self.queue_send(request)
+
+    async def refresh_preset(self, max_age: float | None = 0) -> Preset:
+        """Read the preset sides and name not reported within max_age seconds."""
+        await self.state.get_many(self.presets.fields, max_age)
+        return self.presets.current
+
+    async def sync_preset(self, desired: Preset) -> bool:
+        """Write the parts of the preset that differ from the lamp.
+
+        Returns:
+            bool: True if something had to be written
+        """
+        # the lamp only changes its preset when written
+        await self.refresh_preset(max_age=None)
+        payload = self.presets.diff(desired)
+        if not payload:
+            _LOGGER.debug("(%s) Preset already up to date", self.address)
+            return False
+
+        _LOGGER.info("(%s) Updating preset: %s", self.address, payload)
+        self.queue_send(payload)
+        await self.refresh_preset()
+        return True
+
+    async def read_config(self, desired: dict[str, Any], max_age: float | None = 0) -> list[str]:
+        """Read the settings a desired config manages in one chained request.
+
+        Settings reported within max_age seconds are not read again.
+
+        Returns:
+            list[str]: keys of the settings the lamp did not report
+        """
+        states = await self.state.get_many(self.config.fields(desired), max_age)
+        return [
+            key
+            for setting in self.config.settings(desired)
+            if states[setting.cmdtype] is None
+            for key in setting.keys
+            if key in desired
+        ]
+
+    async def reconcile_config(
+        self, desired: dict[str, Any], max_age: float | None = CONFIG_MAX_AGE
+    ) -> dict:
+        """Write the settings that differ from a desired config and verify them.
+
+        Args:
+            desired: values by key of CONFIG_KEYS, keys left out are not
+                touched
+            max_age: seconds a reported setting is compared without reading
+                it again
+
+        Returns:
+            dict: keys written and confirmed (changed), written but not
+                confirmed by the read-back (failed) and not reported by the
+                lamp, so left untouched (unanswered)
+        """
+        unanswered = await self.read_config(desired, max_age)
+        differing = [key for key in self.config.differing(desired) if key not in unanswered]
+        payload = self.config.diff(desired)
+        if not payload:
+            _LOGGER.debug("(%s) Settings already up to date", self.address)
+            return {"changed": [], "failed": [], "unanswered": unanswered}
+
+        _LOGGER.info("(%s) Updating settings %s: %s", self.address, differing, payload)
+        self.queue_send(payload)
+        # the lamp does not acknowledge writes, read them back
+        await self.read_config({key: desired[key] for key in differing})
+        failed = [key for key in self.config.differing(desired) if key in differing]
+        if failed:
+            _LOGGER.warning("(%s) Settings not applied: %s", self.address, failed)
+        return {
+            "changed": [key for key in differing if key not in failed],
+            "failed": failed,
+            "unanswered": unanswered,
+        }
+
+    def solar_day(self, when: datetime.datetime | None = None) -> SolarDay | None:
+        """Return sun times and the modelled circadian curve of the local day."""
+        if self.latitude is None or self.longitude is None:
+            return None
+        if when is None:
+            when = datetime.datetime.now(datetime.UTC)
+        local = when.astimezone(self.timezone)
+        return solar_day(local.date(), self.latitude, self.longitude, local.tzinfo)
+
+    def _check_sun_times(self, dawn: datetime.datetime, dusk: datetime.datetime) -> None:
+        """Compare the sun times reported by the lamp with the computed ones."""
+        # the lamp reports local wall clock times of today, so compute the
+        # sun times of the local date and compare the times of day only
+        day = self.solar_day()
+        if day is None or day.sunrise is None or day.sunset is None:
+            return
+        for name, reported, computed in (("dawn", dawn, day.sunrise), ("dusk", dusk, day.sunset)):
+            local = computed.astimezone(self.timezone)
+            minutes = (reported.hour - local.hour) * 60 + reported.minute - local.minute
+            deviation = abs((minutes + 720) % 1440 - 720)
+            if deviation > SUN_TIME_TOLERANCE:
+                _LOGGER.warning(
+                    "(%s) Lamp %s at %s differs %.0f minutes from computed %s, check location and UTC offset",
+                    self.address, name, reported.strftime('%H:%M'), deviation, local.strftime('%H:%M'),
+                )
+
+    def _local_utc_offset(self, now: datetime.datetime) -> int:
+        """Return the whole hours the configured time zone is ahead of UTC.
+
+        The lamp only takes whole hours, other offsets are floored and
+        logged once.
+        """
+        offset = now.astimezone(self.timezone).utcoffset()
+        if not offset:
+            return 0
+        hours = int(offset.total_seconds() // 3600)
+        if offset.total_seconds() % 3600 and offset != self._unrepresentable_offset:
+            self._unrepresentable_offset = offset
+            _LOGGER.warning(
+                "(%s) UTC offset %s of the time zone is not a whole hour, the lamp is set to %+d hours",
+                self.address, offset, hours,
+            )
+        return hours
+
+    async def sync_clock(self) -> float:
+        """Read the lamp clock and correct it if it drifted too far.
+
+        The round trip is timed from the GATT write of the request, so the
+        time it waited in the send queue does not bias the offset. The UTC
+        offset is resent whenever the lamp reports a different one than the
+        configured time zone, the next sync is scheduled right after a daylight saving time change.
+
+        Returns:
+            float: seconds until the next sync is due
+        """
+        cmdtype = self._handler.GET_UTC_TIME
+        answer = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(cmdtype, []).append(answer)
+        try:
+            startedAt = await asyncio.wait_for(
+                self.write(self._handler.reqUtcTime()),
+                QUERY_TIMEOUT + (CONNECT_TIMEOUT if self.on_demand and not self.stats.connected else 0),
+            )
+            sent = datetime.datetime.now(datetime.UTC) - datetime.timedelta(
+                seconds=time.monotonic() - startedAt
+            )
+            dataPoint = await asyncio.wait_for(answer, QUERY_TIMEOUT)
+        except (asyncio.TimeoutError, BleakError) as ex:
+            _LOGGER.debug("(%s) Clock read failed: %s", self.address, ex)
+            return CLOCK_SYNC_MIN_INTERVAL
+        finally:
+            with contextlib.suppress(KeyError, ValueError):
+                self._waiters[cmdtype].remove(answer)
+        received = datetime.datetime.now(datetime.UTC)
+
+        offset = self.clock.add_sample(sent, received, dataPoint.dataValue)
+        _LOGGER.debug("(%s) Lamp clock offset %.2fs, drift %.2fppm", self.address, offset, self.clock.drift * 1e6)
+        if self.clock.needs_write(received):
+            await self._write_clock(self.clock.last_rtt)
+            self.clock.reset()
+
+        utcOffset = self._local_utc_offset(received)
+        current = await self.state.get(self._handler.GET_UTC_OFFSET)
+        if current is None:
+            _LOGGER.debug("(%s) UTC offset not answered, not rewriting it", self.address)
+        elif current != utcOffset:
+            _LOGGER.info("(%s) Setting UTC offset to %d", self.address, utcOffset)
+            self.queue_send(self._handler.reqSetUtcOffset(utcOffset))
+            # the lamp does not acknowledge writes, read it back
+            await self.state.get(self._handler.GET_UTC_OFFSET, max_age=0)
+
+        nextSync = self.clock.next_sync_in(received)
+        change = next_offset_change(self.timezone, received, nextSync)
+        if change is not None:
+            nextSync = (change - received).total_seconds() + 1
+        return nextSync
+
+    async def _write_clock(self, rtt: float) -> None:
+        """Write the clock so the lamp receives it on a whole second."""
+        # the lamp only takes whole seconds, so send the next full second
+        # half a round trip before it starts.
+        now = datetime.datetime.now(datetime.UTC)
+        target = (now + datetime.timedelta(seconds=1 + rtt / 2)).replace(microsecond=0)
+        await asyncio.sleep(max(0.0, (target - now).total_seconds() - rtt / 2))
+        _LOGGER.info("(%s) Setting lamp clock to %s", self.address, target)
+        self.queue_send(
+            self._handler.reqSetUtcTime(target)
+            + self._handler.reqSetSunCycleTime(target.astimezone(self.timezone))
+        )
+
+    async def _clock_loop(self):
+        while True:
+            await asyncio.sleep(await self.sync_clock())
 
     async def run(self) -> None:
+        self._drop_stop_markers()
+        main_tasks = set()
         self._loop = asyncio.get_event_loop()
         loop = asyncio.get_event_loop()
         loop.set_exception_handler(self.excp_handler)
@@ -151,8 +803,11 @@ class HeavnOneDevice:
                 asyncio.create_task(self.send_loop()),
                 asyncio.create_task(self.check_loop()),
                 #asyncio.create_task(self.uart.run_loop()),
-                asyncio.create_task(self._collect_metrics())
+                asyncio.create_task(self._collect_metrics()),
+                asyncio.create_task(self._clock_loop())
             }
+            if self.daylight is not None:
+                main_tasks.add(asyncio.create_task(self.daylight.run()))
 
             done, pending = await asyncio.wait(main_tasks, return_when=asyncio.FIRST_COMPLETED)
             _LOGGER.debug(f'Completed Tasks: {[(t._coro, t.result()) for t in done]}')
@@ -165,9 +820,133 @@ class HeavnOneDevice:
             _LOGGER.exception(e)
         finally:
             _LOGGER.warning('Shutdown initiated')
+            # the loops of this connection must not outlive it
+            for task in main_tasks:
+                task.cancel()
             _LOGGER.info('Shutdown complete.')
             await self.disconnect()
 
+    async def maintain_connection(self) -> None:
+        """Keep the lamp connected while it is in range.
+
+        No connection is attempted while the Bluetooth stack reports the
+        lamp unavailable, so an absent lamp does not tie up a connection
+        slot of the adapter or proxy.
+        """
+        if self.on_demand:
+            await self._on_demand_loop()
+            return
+
+        delay = RECONNECT_DELAY
+        while True:
+            if not self.presence.present():
+                _LOGGER.info('(%s) Out of range, waiting for an advertisement', self.address)
+                await self.presence.wait_present()
+            try:
+                await self.connect(self._ble_device)
+            except (BleakError, asyncio.TimeoutError) as e:
+                self.stats.connect_failures += 1
+                _LOGGER.warning('(%s) Connection failed, retrying in %ds: %s', self.address, delay, e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+                continue
+            delay = RECONNECT_DELAY
+            await self.run()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    async def _on_demand_loop(self) -> None:
+        """Connect for every poll window or queued command.
+
+        Everything pending is sent in one burst, the connection is closed
+        after idle_timeout seconds without traffic.
+        """
+        self._queue_initial_requests()
+        backgroundTasks = [
+            asyncio.create_task(self._clock_loop()),
+            asyncio.create_task(self._probe_pending()),
+        ]
+        if self.daylight is not None:
+            backgroundTasks.append(asyncio.create_task(self.daylight.run()))
+        cycle = 0
+        nextPoll = time.monotonic()
+        delay = RECONNECT_DELAY
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= nextPoll:
+                    self._queue_poll(cycle)
+                    cycle += 1
+                    nextPoll = now + self.poll_interval
+                self._drop_stop_markers()
+                if self._send_queue.empty():
+                    self._wake.clear()
+                    with contextlib.suppress(asyncio.TimeoutError):
+                        await asyncio.wait_for(self._wake.wait(), nextPoll - now)
+                    continue
+
+                if not self.presence.present():
+                    _LOGGER.info('(%s) Out of range, waiting for an advertisement', self.address)
+                    await self.presence.wait_present()
+                try:
+                    await self.connect(self._ble_device)
+                except (BleakError, asyncio.TimeoutError) as e:
+                    self.stats.connect_failures += 1
+                    _LOGGER.warning('(%s) Connection failed, retrying in %ds: %s', self.address, delay, e)
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, RECONNECT_MAX_DELAY)
+                    continue
+                delay = RECONNECT_DELAY
+                await self._session()
+        finally:
+            for task in backgroundTasks:
+                task.cancel()
+
+    async def _session(self) -> None:
+        """Send everything queued and disconnect once idle."""
+        self._drop_stop_markers()
+        self._last_activity = time.monotonic()
+        tasks = {
+            asyncio.create_task(self.send_loop()),
+            asyncio.create_task(self._idle_watch()),
+        }
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    _LOGGER.warning('(%s) Session ended: %s', self.address, task.exception())
+        finally:
+            for task in tasks:
+                task.cancel()
+            await self.disconnect()
+
+    async def _idle_watch(self) -> None:
+        """Return once nothing was sent or received for idle_timeout seconds.
+
+        Unanswered queries keep the connection for up to QUERY_TIMEOUT.
+        """
+        while True:
+            idle = time.monotonic() - self._last_activity
+            waiting = any(self._waiters.values()) and idle < QUERY_TIMEOUT
+            if idle >= self.idle_timeout and self._send_queue.empty() and not waiting:
+                return
+            await asyncio.sleep(max(self.idle_timeout - idle, 0.1))
+
+    def _on_bluetooth_auto_off(self, enabled: bool) -> None:
+        """Hint at on-demand mode once the lamp reports Bluetooth auto off."""
+        if enabled and not self.on_demand and not self._auto_off_hinted:
+            # the lamp drops idle connections itself, every drop is a reconnect
+            _LOGGER.info('(%s) Bluetooth auto off is enabled, on-demand mode avoids reconnects', self.address)
+            self._auto_off_hinted = True
+
+    def _drop_stop_markers(self) -> None:
+        """Remove stop markers of an earlier connection from the send queue."""
+        items = []
+        while not self._send_queue.empty():
+            item = self._send_queue.get_nowait()
+            if item is not None:
+                items.append(item)
+        for item in items:
+            self._send_queue.put_nowait(item)
 
     def excp_handler(self, loop: asyncio.AbstractEventLoop, context):
         # Handles exception from other tasks (inside bleak disconnect, etc)
@@ -178,30 +957,126 @@ class HeavnOneDevice:
 
     async def disconnect(self) -> None:
         if self._client:
-            await self._client.stop_notify(UART_READ_UUID)
+            # the lamp may have dropped the connection already
+            with contextlib.suppress(BleakError):
+                await self._client.stop_notify(UART_READ_UUID)
             await self._client.disconnect()
+        self._disconnected.set()
 
     def handle_disconnect(self, client: BleakClient):
-        _LOGGER.warning(f'Device {client.address} disconnected')
+        # on-demand connections are closed on purpose after every session
+        log = _LOGGER.debug if self.on_demand else _LOGGER.warning
+        log(f'Device {client.address} disconnected')
+        self.stats.on_disconnected()
+        self._disconnected.set()
         self.stop_loop()
 
+    async def wait_idle(self) -> None:
+        """Wait until an on-demand session has closed its connection.
+
+        Returns at once in always connected mode, the connection is kept.
+        """
+        if self.on_demand:
+            await self._disconnected.wait()
+
     async def send_loop(self):
         while True:
-            data = await self._send_queue.get()
-            if data is None:
+            item = await self._send_queue.get()
+            if item is None:
                 break # Let future end on shutdown
+            data, queuedAt, done = item
             #if not self.write_enabled:
             #    logging.warning(f'Ignoring unexpected write data: {data}')
             #    continue
             _LOGGER.debug('(%s) Sending: %s', self.address, data)
-            await self._client.write_gatt_char(UART_WRITE_UUID, data, True)
+            startedAt = time.monotonic()
+            writes = self._handler.splitFrames(data, self._max_write)
+            if len(writes) > 1:
+                self.stats.fragmented_payloads += 1
+            try:
+                for chunk in writes:
+                    await self._client.write_gatt_char(UART_WRITE_UUID, chunk, True)
+            except Exception as ex:
+                if done is not None and not done.done():
+                    done.set_exception(ex)
+                raise
+            if self._capture is not None:
+                self._capture.write(OUTGOING, data)
+            writtenAt = time.monotonic()
+            self.stats.on_written(
+                len(data),
+                startedAt - queuedAt,
+                writtenAt - startedAt,
+                self._send_queue.qsize(),
+            )
+            if self.tracer is not None:
+                self.tracer.on_written(data, queuedAt, startedAt, writtenAt)
+            self._last_activity = writtenAt
+            if done is not None and not done.done():
+                done.set_result(startedAt)
 
     def stop_loop(self):
         logging.info('Stopping Bluetooth event loop')
         self._send_queue.put_nowait(None)
 
-    def queue_send(self, data: bytes):
-        self._send_queue.put_nowait(data)
+    def queue_send(self, data: bytes, done: asyncio.Future | None = None):
+        self._send_queue.put_nowait((data, time.monotonic(), done))
+        self._wake.set()
+        self.stats.on_queued(self._send_queue.qsize())
+
+    async def write(self, data: bytes) -> float:
+        """Queue data and wait until it was written to the lamp.
+
+        Returns the monotonic time the write started. If the wait is cancelled before the write started, the data is
+        removed from the send queue again.
+        """
+        done = asyncio.get_running_loop().create_future()
+        self.queue_send(data, done)
+        try:
+            return await done
+        except asyncio.CancelledError:
+            self._withdraw(done)
+            raise
+
+    def _withdraw(self, done: asyncio.Future) -> None:
+        """Remove the queued write completing a future from the send queue."""
+        items = []
+        while not self._send_queue.empty():
+            item = self._send_queue.get_nowait()
+            if item is None or item[2] is not done:
+                items.append(item)
+        for item in items:
+            self._send_queue.put_nowait(item)
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return a snapshot of the device and its transport statistics."""
+        return {
+            "name": self.name,
+            "serial_number": self.serial_number,
+            "sw_version": self.sw_version,
+            "hw_version": self.hw_version,
+            "rssi": self.rssi,
+            "last_sample_time": self.last_sample_time.isoformat() if self.last_sample_time else None,
+            "presence": self.presence.as_dict(),
+            "on_demand": self.on_demand,
+            "bluetooth_auto_off": self.bluetooth_auto_off,
+            "max_write": self._max_write,
+            "statistics": self.stats.as_dict(),
+            "clock": self.clock.as_dict(datetime.datetime.now(datetime.UTC)),
+            "preset": self.presets.current.as_dict(),
+            "config": self.config.current,
+            "capabilities": self.capabilities.as_dict(),
+            "tracing": self.tracer.as_dict() if self.tracer is not None else None,
+            "daylight": self.daylight.as_dict() if self.daylight is not None else None,
+            "state": self.state.as_dict(),
+            "transitions": {
+                "latency": self.transitions.latency,
+                "frames_sent": self.transitions.frames_sent,
+                "frames_dropped": self.transitions.frames_dropped,
+            },
+            "streams": [stream.as_dict() for stream in self._streams],
+            "raw_samples": self._aggregator.raw_samples() if self._aggregator else None,
+        }
 
     async def check_loop(self):
         while True:
@@ -209,18 +1084,24 @@ class HeavnOneDevice:
 
     def update_from_advertisement(
         self,
-        service_info: BLEDevice,
-        change: AdvertisementData,
+        ble_device: BLEDevice,
+        advertisement: AdvertisementData,
+        connectable: bool = True,
     ) -> None:
-        self.rssi = service_info.rssi
-        self.name = service_info.name
-        self.connectable = service_info.connectable
+        """Update presence, RSSI and the BLEDevice used for reconnects."""
+        self.rssi = advertisement.rssi
+        self.connectable = connectable
+        if connectable:
+            # the BLEDevice of the adapter or proxy that heard the lamp last
+            self._ble_device = ble_device
+        self.presence.update(advertisement.rssi)
 
     @classmethod
     def fromDevice(cls, device):
         self = cls()
         self.name = device.name
         self.address = device.address
+        self._ble_device = device
 
         return self
 
@@ -305,6 +1186,8 @@ class HeavnOneBluetoothDeviceData:
     async def update_device(self, ble_device: BLEDevice) -> HeavnOneDevice:
         """Connects to the device through BLE and retrieves relevant data"""
 
+        from bleak_retry_connector import establish_connection
+
         client = await establish_connection(BleakClient, ble_device, ble_device.address)
         device = HeavnOneDevice()
         device.name = ble_device.name
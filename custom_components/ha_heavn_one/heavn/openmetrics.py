@@ -0,0 +1,135 @@
+"""OpenMetrics text exposition of the readings and link health of lamps."""
+from __future__ import annotations
+
+from collections.abc import Iterable
+import math
+from typing import TYPE_CHECKING
+
+from .handler import HeavnOneProtocolHandler
+from .stats import Histogram
+
+if TYPE_CHECKING:
+    from .models import HeavnOneDevice
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PREFIX = "heavn"
+
+# metric name, unit, command type, help
+READINGS = (
+    ("temperature_celsius", "celsius", HeavnOneProtocolHandler.GET_TEMPERATURE, "Temperature"),
+    ("humidity_percent", "percent", HeavnOneProtocolHandler.GET_HUMIDITY, "Relative humidity"),
+    ("pressure", None, HeavnOneProtocolHandler.GET_PRESSURE, "Air pressure as reported"),
+    ("co2", None, HeavnOneProtocolHandler.GET_CO2, "CO2 estimate of the BME680"),
+    ("co2_accuracy", None, HeavnOneProtocolHandler.GET_CO2_ACCURACY, "Accuracy of the CO2 estimate (0-3)"),
+    ("ambient_light", None, HeavnOneProtocolHandler.GET_LIGHT_SENSOR, "Ambient light sensor"),
+)
+
+# metric name, statistics attribute, help
+COUNTERS = (
+    ("commands_sent", "commands_sent", "Payloads written to the lamp"),
+    ("bytes_written", "bytes_written", "Bytes written to the lamp"),
+    ("fragmented_payloads", "fragmented_payloads", "Payloads split into several writes"),
+    ("notifications_received", "notifications_received", "Notifications received from the lamp"),
+    ("parse_failures", "parse_failures", "Notifications that could not be parsed"),
+    ("unknown_commands", "unknown_commands", "Notifications with an unknown command"),
+    ("connects", "connects", "Connections established"),
+    ("connect_failures", "connect_failures", "Failed connection attempts"),
+    ("connected_seconds", "time_connected", "Seconds the lamp was connected"),
+)
+
+# metric name, statistics attribute, help
+HISTOGRAMS = (
+    ("write_latency_seconds", "write_latency", "Duration of a write"),
+    ("queue_wait_seconds", "queue_wait", "Time a payload waited in the send queue"),
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Writer:
+    """Collect the lines of one exposition."""
+
+    def __init__(self) -> None:
+        self.lines: list[str] = []
+
+    def family(self, name: str, kind: str, help: str, unit: str | None = None) -> None:
+        name = f"{PREFIX}_{name}"
+        self.lines.append(f"# TYPE {name} {kind}")
+        if unit is not None:
+            self.lines.append(f"# UNIT {name} {unit}")
+        self.lines.append(f"# HELP {name} {_escape(help)}")
+
+    def sample(self, name: str, labels: dict[str, str], value: float) -> None:
+        labelText = ",".join(f'{key}="{_escape(str(v))}"' for key, v in labels.items())
+        self.lines.append(f"{PREFIX}_{name}{{{labelText}}} {_number(value)}")
+
+    def histogram(self, name: str, labels: dict[str, str], histogram: Histogram) -> None:
+        cumulative = 0
+        for bound, count in zip([*histogram.buckets, math.inf], histogram.counts):
+            cumulative += count
+            self.sample(f"{name}_bucket", {**labels, "le": _number(float(bound))}, cumulative)
+        self.sample(f"{name}_count", labels, histogram.count)
+        self.sample(f"{name}_sum", labels, histogram.sum)
+
+    def text(self) -> str:
+        return "\n".join([*self.lines, "# EOF", ""])
+
+
+def _labels(device: HeavnOneDevice) -> dict[str, str]:
+    return {"address": device.address, "name": device.name}
+
+
+def render(devices: Iterable[HeavnOneDevice]) -> str:
+    """Render the latest readings and link statistics of lamps.
+
+    Everything comes from memory, nothing is sent to the lamps.
+    """
+    devices = list(devices)
+    writer = _Writer()
+
+    for name, unit, cmdtype, help in READINGS:
+        writer.family(name, "gauge", help, unit)
+        for device in devices:
+            if (state := device.state.peek(cmdtype)) is not None:
+                writer.sample(name, _labels(device), state.value)
+    writer.family("reading_age_seconds", "gauge", "Seconds since the reading was received", "seconds")
+    for device in devices:
+        for _, _, cmdtype, _ in READINGS:
+            if (state := device.state.peek(cmdtype)) is not None:
+                writer.sample("reading_age_seconds", {**_labels(device), "command": cmdtype}, state.age)
+
+    writer.family("connected", "gauge", "Lamp is connected")
+    for device in devices:
+        writer.sample("connected", _labels(device), device.stats.connected)
+    writer.family("present", "gauge", "Lamp was heard advertising recently")
+    for device in devices:
+        writer.sample("present", _labels(device), device.presence.present())
+    writer.family("rssi_dbm", "gauge", "Smoothed RSSI of the advertisements", "dbm")
+    for device in devices:
+        if device.presence.rssi is not None:
+            writer.sample("rssi_dbm", _labels(device), device.presence.rssi)
+    writer.family("queue_depth", "gauge", "Payloads waiting in the send queue")
+    for device in devices:
+        writer.sample("queue_depth", _labels(device), device.stats.queue_depth)
+
+    for name, attribute, help in COUNTERS:
+        writer.family(name, "counter", help)
+        for device in devices:
+            writer.sample(f"{name}_total", _labels(device), getattr(device.stats, attribute))
+
+    for name, attribute, help in HISTOGRAMS:
+        writer.family(name, "histogram", help, "seconds")
+        for device in devices:
+            writer.histogram(name, _labels(device), getattr(device.stats, attribute))
+
+    return writer.text()
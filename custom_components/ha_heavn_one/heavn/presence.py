@@ -0,0 +1,71 @@
+"""Presence and signal strength of a HEAVN One lamp from its advertisements."""
+from __future__ import annotations
+
+import asyncio
+import time
+
+# seconds since the last advertisement up to which a lamp counts as
+# recently seen, for diagnostics only: the Bluetooth stack does not report
+# advertisements that only differ in RSSI, so silence is not absence
+PRESENCE_TIMEOUT = 300
+# weight of a new RSSI sample
+RSSI_ALPHA = 0.25
+
+
+class PresenceTracker:
+    """Track if a lamp is in range, when it was last heard and a smoothed RSSI.
+
+    A lamp is present from its first advertisement until the Bluetooth
+    stack reports it unavailable (mark_absent).
+    """
+
+    def __init__(self, timeout: float = PRESENCE_TIMEOUT) -> None:
+        """Initialize the tracker, the lamp is absent until it is heard."""
+        self.timeout = timeout
+        self.last_seen: float | None = None
+        self._present = False
+        self.rssi: float | None = None
+        self.advertisements = 0
+        self._seen = asyncio.Event()
+
+    def update(self, rssi: int | None = None, now: float | None = None) -> None:
+        """Record an advertisement."""
+        self.last_seen = time.monotonic() if now is None else now
+        self._present = True
+        self.advertisements += 1
+        if rssi is not None:
+            self.rssi = rssi if self.rssi is None else self.rssi + RSSI_ALPHA * (rssi - self.rssi)
+        self._seen.set()
+
+    def mark_absent(self) -> None:
+        """Forget the lamp, e.g. when the Bluetooth stack reports it unavailable."""
+        self._present = False
+        self._seen.clear()
+
+    def present(self) -> bool:
+        """Return if the lamp was heard and not reported unavailable since."""
+        return self._present
+
+    def recently_seen(self, now: float | None = None) -> bool:
+        """Return if an advertisement was heard within the timeout."""
+        if self.last_seen is None:
+            return False
+        if now is None:
+            now = time.monotonic()
+        return now - self.last_seen <= self.timeout
+
+    async def wait_present(self) -> None:
+        """Wait until the lamp is heard again."""
+        while not self.present():
+            self._seen.clear()
+            await self._seen.wait()
+
+    def as_dict(self) -> dict:
+        """Return the presence as plain data."""
+        return {
+            "present": self.present(),
+            "recently_seen": self.recently_seen(),
+            "seconds_since_seen": None if self.last_seen is None else time.monotonic() - self.last_seen,
+            "rssi": self.rssi,
+            "advertisements": self.advertisements,
+        }
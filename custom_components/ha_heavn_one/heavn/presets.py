@@ -0,0 +1,84 @@
+"""Preset of a HEAVN One lamp and diff based synchronization."""
+from __future__ import annotations
+
+import dataclasses
+
+from .handler import HeavnOneProtocolHandler
+from .state import StateStore
+
+# the lamp stores names with a fixed length of ten characters
+PRESET_NAME_LENGTH = 10
+
+
+@dataclasses.dataclass
+class Preset:
+    """Name and (intensity, temperature) per side of a preset.
+
+    A side or name set to None is unknown (current) or left untouched (desired).
+    """
+
+    name: str | None = None
+    sides: list[tuple[int, int] | None] = dataclasses.field(
+        default_factory=lambda: [None] * len(HeavnOneProtocolHandler.SIDES)
+    )
+
+    @property
+    def complete(self) -> bool:
+        """Return if the name and all sides are known."""
+        return self.name is not None and all(side is not None for side in self.sides)
+
+    def as_dict(self) -> dict:
+        """Return the preset as plain data."""
+        return {
+            "name": self.name,
+            "sides": {
+                sideName: None if side is None else {"intensity": side[0], "temperature": side[1]}
+                for sideName, side in zip(HeavnOneProtocolHandler.SIDES, self.sides)
+            },
+        }
+
+
+def normalize_name(name: str) -> str:
+    """Return the name as the lamp stores it."""
+    return name[:PRESET_NAME_LENGTH].rstrip()
+
+
+class PresetManager:
+    """Compare a desired preset with the state of a lamp and write only what differs."""
+
+    def __init__(self, handler: HeavnOneProtocolHandler, state: StateStore) -> None:
+        """Initialize the manager."""
+        self._handler = handler
+        self._state = state
+
+    @property
+    def fields(self) -> list[str]:
+        """Return the state fields holding the preset."""
+        return [
+            *(self._handler.presetSideCommand(side) for side in range(len(self._handler.SIDES))),
+            self._handler.GET_PRESET_NAME,
+        ]
+
+    @property
+    def current(self) -> Preset:
+        """Return the preset as last reported by the lamp."""
+        *sides, name = (self._state.peek(field) for field in self.fields)
+        return Preset(
+            name=name.value if name is not None else None,
+            sides=[side.value if side is not None else None for side in sides],
+        )
+
+    def diff(self, desired: Preset) -> bytes:
+        """Build one chained payload writing the sides and name that differ.
+
+        Returns:
+            bytes: payload, empty if the lamp already matches
+        """
+        current = self.current
+        payload = b''
+        for side, (wanted, known) in enumerate(zip(desired.sides, current.sides)):
+            if wanted is not None and wanted != known:
+                payload += self._handler.reqSetPresetSide(side, *wanted)
+        if desired.name and normalize_name(desired.name) != current.name:
+            payload += self._handler.reqSetPresetName(desired.name)
+        return payload
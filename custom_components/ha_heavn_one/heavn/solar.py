@@ -0,0 +1,136 @@
+"""Local computation of sun times and a circadian curve for a HEAVN One lamp.
+
+The curve is the integration's own model following the sun elevation,
+the curve the lamp runs itself is not known.
+"""
+from __future__ import annotations
+
+import dataclasses
+import datetime
+import functools
+import math
+
+# minutes between two points of the circadian curve
+CURVE_STEP = 15
+# sun elevation in degrees at which the curve reaches its daytime maximum
+CURVE_FULL_ELEVATION = 30.0
+# limits of the modelled curve in the units of the lamp (percent, hundreds of kelvin)
+CURVE_INTENSITY = (20, 100)
+CURVE_TEMPERATURE = (27, 65)
+# coordinates are rounded so nearby lamps share a table
+LOCATION_DIGITS = 2
+
+_J2000 = 2451545.0
+_UNIX_EPOCH_JD = 2440587.5
+_OBLIQUITY = math.radians(23.4397)
+_SUNRISE_ELEVATION = math.radians(-0.833)
+
+
+@dataclasses.dataclass(frozen=True)
+class CurvePoint:
+    """Modelled lamp output at a point in time."""
+
+    time: datetime.datetime
+    elevation: float
+    intensity: int
+    temperature: int
+
+
+@dataclasses.dataclass(frozen=True)
+class SolarDay:
+    """Sun times and modelled circadian curve of one local day at one location."""
+
+    date: datetime.date
+    latitude: float
+    longitude: float
+    sunrise: datetime.datetime | None
+    sunset: datetime.datetime | None
+    curve: tuple[CurvePoint, ...]
+
+    def at(self, when: datetime.datetime) -> CurvePoint:
+        """Return the curve point in effect at the given time."""
+        start = self.curve[0].time
+        index = int((when - start).total_seconds() // (CURVE_STEP * 60))
+        return self.curve[max(0, min(index, len(self.curve) - 1))]
+
+
+def _julian(when: datetime.datetime) -> float:
+    return when.timestamp() / 86400 + _UNIX_EPOCH_JD
+
+
+def _from_julian(julian: float) -> datetime.datetime:
+    return datetime.datetime.fromtimestamp((julian - _UNIX_EPOCH_JD) * 86400, datetime.UTC)
+
+
+def _curve_factor(elevation: float) -> float:
+    """Return 0 (night) .. 1 (day) with a smooth step over the elevation."""
+    x = max(0.0, min(1.0, elevation / CURVE_FULL_ELEVATION))
+    return x * x * (3 - 2 * x)
+
+
+@functools.lru_cache(maxsize=32)
+def _solar_day(
+    date: datetime.date, latitude: float, longitude: float, timezone: datetime.tzinfo
+) -> SolarDay:
+    # sunrise equation, precise to about a minute
+    noon = datetime.datetime(date.year, date.month, date.day, 12, tzinfo=datetime.UTC)
+    meanSolarTime = round(_julian(noon) - _J2000 + 0.0008) - longitude / 360
+    anomaly = math.radians((357.5291 + 0.98560028 * meanSolarTime) % 360)
+    center = (
+        1.9148 * math.sin(anomaly)
+        + 0.02 * math.sin(2 * anomaly)
+        + 0.0003 * math.sin(3 * anomaly)
+    )
+    eclipticLongitude = math.radians((math.degrees(anomaly) + center + 180 + 102.9372) % 360)
+    transit = (
+        _J2000 + meanSolarTime
+        + 0.0053 * math.sin(anomaly)
+        - 0.0069 * math.sin(2 * eclipticLongitude)
+    )
+    declination = math.asin(math.sin(eclipticLongitude) * math.sin(_OBLIQUITY))
+
+    phi = math.radians(latitude)
+    cosHourAngle = (math.sin(_SUNRISE_ELEVATION) - math.sin(phi) * math.sin(declination)) / (
+        math.cos(phi) * math.cos(declination)
+    )
+    sunrise = sunset = None
+    if -1 <= cosHourAngle <= 1:
+        hourAngle = math.degrees(math.acos(cosHourAngle))
+        sunrise = _from_julian(transit - hourAngle / 360)
+        sunset = _from_julian(transit + hourAngle / 360)
+
+    transitTime = _from_julian(transit)
+    # the curve spans the local day, 23 or 25 hours on a DST change
+    start = datetime.datetime(date.year, date.month, date.day, tzinfo=timezone).astimezone(datetime.UTC)
+    nextDay = date + datetime.timedelta(days=1)
+    end = datetime.datetime(nextDay.year, nextDay.month, nextDay.day, tzinfo=timezone).astimezone(datetime.UTC)
+    points = []
+    for minute in range(0, int((end - start).total_seconds() // 60), CURVE_STEP):
+        when = start + datetime.timedelta(minutes=minute)
+        hourAngle = math.radians((when - transitTime).total_seconds() / 86400 * 360)
+        elevation = math.degrees(math.asin(
+            math.sin(phi) * math.sin(declination)
+            + math.cos(phi) * math.cos(declination) * math.cos(hourAngle)
+        ))
+        factor = _curve_factor(elevation)
+        points.append(CurvePoint(
+            when,
+            round(elevation, 2),
+            round(CURVE_INTENSITY[0] + (CURVE_INTENSITY[1] - CURVE_INTENSITY[0]) * factor),
+            round(CURVE_TEMPERATURE[0] + (CURVE_TEMPERATURE[1] - CURVE_TEMPERATURE[0]) * factor),
+        ))
+
+    return SolarDay(date, latitude, longitude, sunrise, sunset, tuple(points))
+
+
+def solar_day(
+    date: datetime.date, latitude: float, longitude: float, timezone: datetime.tzinfo = datetime.UTC
+) -> SolarDay:
+    """Return the precomputed sun times and curve of a local day.
+
+    Tables are cached per day, location and time zone, so this is cheap
+    to call on every update.
+    """
+    return _solar_day(
+        date, round(latitude, LOCATION_DIGITS), round(longitude, LOCATION_DIGITS), timezone
+    )
@@ -0,0 +1,231 @@
+"""Read-through cache of the values reported by a HEAVN One lamp."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+import dataclasses
+import time
+from typing import Any
+
+from .handler import HeavnOneData, HeavnOneProtocolHandler
+
+QueryFunc = Callable[[bytes, str], Awaitable[HeavnOneData | None]]
+ChainedQueryFunc = Callable[[bytes, list[str]], Awaitable[dict[str, HeavnOneData | None]]]
+
+
+@dataclasses.dataclass(frozen=True)
+class StateValue:
+    """Last value of a field with its monotonic receive time and version."""
+
+    value: Any
+    received: float
+    version: int
+    attributes: dict | None = None
+
+    @property
+    def age(self) -> float:
+        """Return the seconds since the value was received."""
+        return time.monotonic() - self.received
+
+
+def read_requests(handler: HeavnOneProtocolHandler) -> dict[str, Callable[[], bytes]]:
+    """Return the request reading each field that can be read on its own."""
+    requests = {
+        handler.GET_AIR_QUALITY_LED_ENABLED: handler.reqAirQualityLED,
+        handler.GET_BLUETOOTH_AUTO_OFF_ENABLED: handler.reqBluetoothAutoOff,
+        handler.GET_COFFEE_RELAX_ACTIVITY: handler.reqCoffeeRelaxActivity,
+        handler.GET_COWORKING_DEFAULT_INTENSITY: handler.reqCoworkingDefaultIntensity,
+        handler.GET_COWORKING_MODE_ENABLE: handler.reqCoworkingMode,
+        handler.GET_GESTURE_SENSORS_ENABLED: handler.reqGestureSensorsEnabled,
+        handler.GET_LATITUDE: handler.reqGetLocation,
+        handler.GET_LIGHT_SENSOR: handler.reqLightSensor,
+        handler.GET_LONGITUDE: handler.reqGetLocation,
+        handler.GET_MAIN_PCB_FIRMWARE_VERSION: handler.reqHwVersion,
+        handler.GET_MANUAL_MODE_ENABLED: handler.reqGetManualModeState,
+        handler.GET_NAME: handler.reqName,
+        handler.GET_PRESENCE: handler.reqGetPresence,
+        handler.GET_PRESET_NAME: handler.reqGetPresetName,
+        handler.GET_SERIAL_NUMBER: handler.reqSerialNumber,
+        handler.GET_SUN_CYCLE_TIME: handler.reqGetSunCycleTime,
+        handler.GET_SUN_DOWN_AND_DAWN: handler.reqGetSunDownAndDawn,
+        handler.GET_TOP_MID_BOT: handler.reqButtonStates,
+        handler.GET_UTC_OFFSET: handler.reqGetUtcOffset,
+        handler.GET_UTC_TIME: handler.reqUtcTime,
+        handler.GET_VERSION: handler.reqVersion,
+    }
+    # the lamp answers the readings in the metrics frame only
+    for reading in handler.METRICS_READINGS:
+        requests[reading] = handler.reqGetMetrics
+    for channel in range(handler.CHANNEL_COUNT):
+        requests[handler.channelCommand(channel)] = (
+            lambda channel=channel: handler.reqGetAllChannels(channel)
+        )
+    for side in range(len(handler.SIDES)):
+        requests[handler.presetSideCommand(side)] = (
+            lambda side=side: handler.reqGetPresetSide(side)
+        )
+    return requests
+
+
+class StateStore:
+    """Values of a lamp by command type, filled from every parsed data point.
+
+    get() answers from the cache while the value is fresh enough and reads
+    it from the lamp otherwise, get_many() reads all stale fields in one
+    chained request. Concurrent reads of the same field share a single
+    query.
+    """
+
+    def __init__(
+        self,
+        handler: HeavnOneProtocolHandler,
+        query: QueryFunc,
+        query_chained: ChainedQueryFunc,
+    ) -> None:
+        """Initialize the store.
+
+        Args:
+            handler: protocol handler building the read requests
+            query: sends a request and waits for the data point of a command
+                type, e.g. HeavnOneDevice.query
+            query_chained: sends a request and waits for the data points of
+                several command types, e.g. HeavnOneDevice.query_chained
+
+        """
+        self._query = query
+        self._query_chained = query_chained
+        self._requests = read_requests(handler)
+        self._values: dict[str, StateValue] = {}
+        self._pending: dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.reads = 0
+
+    def update(self, dataPoint: HeavnOneData, now: float | None = None) -> None:
+        """Store the value of a data point."""
+        previous = self._values.get(dataPoint.cmd)
+        self._values[dataPoint.cmd] = StateValue(
+            dataPoint.dataValue,
+            time.monotonic() if now is None else now,
+            previous.version + 1 if previous is not None else 1,
+            dataPoint.attributes,
+        )
+
+    def peek(self, field: str) -> StateValue | None:
+        """Return the cached value of a field without reading it."""
+        return self._values.get(field)
+
+    def readable(self, field: str) -> bool:
+        """Return if get() can read the field from the lamp."""
+        return field in self._requests
+
+    async def get(self, field: str, max_age: float | None = None) -> Any:
+        """Return the value of a field, at most max_age seconds old.
+
+        Args:
+            field: command type, e.g. HeavnOneProtocolHandler.GET_NAME
+            max_age: accepted age of a cached value, None accepts any age
+
+        Returns:
+            the value, the stale one if the lamp did not answer, or None if
+            it never reported the field
+
+        Raises:
+            KeyError: the field is not cached and cannot be read on its own
+        """
+        cached = self._values.get(field)
+        if cached is not None and (max_age is None or cached.age <= max_age):
+            self.hits += 1
+            return cached.value
+        if field not in self._requests:
+            if cached is not None:
+                return cached.value
+            raise KeyError(field)
+
+        future = self._pending.get(field)
+        if future is None:
+            self.reads += 1
+            future = asyncio.ensure_future(self._query(self._requests[field](), field))
+            self._track(future, [field])
+        # a cancelled caller must not cancel the read the others wait for
+        await asyncio.shield(future)
+        cached = self._values.get(field)
+        return cached.value if cached is not None else None
+
+    async def get_many(
+        self, fields: list[str], max_age: float | None = None
+    ) -> dict[str, StateValue | None]:
+        """Return the state of several fields, at most max_age seconds old.
+
+        The fields that are not fresh enough are read in one chained
+        request, fields already being read wait for that read.
+
+        Args:
+            fields: command types
+            max_age: accepted age of a cached value, None accepts any age,
+                0 always reads
+
+        Returns:
+            the state by field, None if the field is not fresh enough and
+            the lamp did not answer
+        """
+        result: dict[str, StateValue | None] = {}
+        stale: list[str] = []
+        for field in dict.fromkeys(fields):
+            cached = self._values.get(field)
+            if cached is not None and (max_age is None or cached.age <= max_age):
+                self.hits += 1
+                result[field] = cached
+            elif field in self._requests:
+                stale.append(field)
+            else:
+                result[field] = None
+        if not stale:
+            return result
+
+        versions = {field: self._version(field) for field in stale}
+        futures = {self._pending[field] for field in stale if field in self._pending}
+        toRead = [field for field in stale if field not in self._pending]
+        if toRead:
+            self.reads += 1
+            # several fields may share a request, e.g. latitude and longitude
+            payload = b''.join(dict.fromkeys(self._requests[field]() for field in toRead))
+            future = asyncio.ensure_future(self._query_chained(payload, toRead))
+            self._track(future, toRead)
+            futures.add(future)
+        await asyncio.shield(asyncio.gather(*futures))
+        for field in stale:
+            answered = self._version(field) != versions[field]
+            result[field] = self._values[field] if answered else None
+        return result
+
+    def _version(self, field: str) -> int:
+        cached = self._values.get(field)
+        return cached.version if cached is not None else 0
+
+    def _track(self, future: asyncio.Future, fields: list[str]) -> None:
+        """Share a running read of fields with later callers."""
+        for field in fields:
+            self._pending[field] = future
+
+        def done(_: asyncio.Future) -> None:
+            for field in fields:
+                if self._pending.get(field) is future:
+                    del self._pending[field]
+
+        future.add_done_callback(done)
+
+    def as_dict(self) -> dict:
+        """Return all cached values as plain data."""
+        return {
+            "hits": self.hits,
+            "reads": self.reads,
+            "values": {
+                field: {
+                    "value": state.value,
+                    "age": state.age,
+                    "version": state.version,
+                    "attributes": state.attributes,
+                }
+                for field, state in sorted(self._values.items())
+            },
+        }
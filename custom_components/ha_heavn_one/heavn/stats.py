@@ -0,0 +1,156 @@
+"""Counters and histograms describing the HEAVN One transport."""
+from __future__ import annotations
+
+from bisect import bisect_left
+import time
+
+# upper bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# upper bounds in queued items
+QUEUE_DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64)
+
+
+class Histogram:
+    """Histogram with fixed buckets, constant memory and O(log buckets) per sample."""
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        """Initialize the histogram.
+
+        Args:
+            buckets (tuple): sorted upper bounds, an overflow bucket is added.
+
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min: float | None = None
+        self.max: float | None = None
+
+    def observe(self, value: float) -> None:
+        """Add a sample."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float | None:
+        """Return the mean of all samples."""
+        if not self.count:
+            return None
+        return self.sum / self.count
+
+    def quantile(self, q: float) -> float | None:
+        """Return the upper bound of the bucket holding the q-quantile."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucketCount in enumerate(self.counts):
+            seen += bucketCount
+            if seen >= rank:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def as_dict(self) -> dict:
+        """Return the histogram as plain data."""
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.mean,
+            "p95": self.quantile(0.95),
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.counts)),
+        }
+
+
+class HeavnOneStatistics:
+    """Transport and scheduler statistics of a single lamp."""
+
+    def __init__(self) -> None:
+        """Initialize all counters."""
+        self.commands_sent = 0
+        self.bytes_written = 0
+        self.fragmented_payloads = 0
+        self.notifications_received = 0
+        self.parse_failures = 0
+        self.unknown_commands = 0
+        self.metrics_frames = 0
+        self.incomplete_frames = 0
+        self.connects = 0
+        self.connect_failures = 0
+        self.queue_depth = 0
+        self.write_latency = Histogram(LATENCY_BUCKETS)
+        self.queue_wait = Histogram(LATENCY_BUCKETS)
+        self.queue_depth_histogram = Histogram(QUEUE_DEPTH_BUCKETS)
+        self._connected_since: float | None = None
+        self._connected_time = 0.0
+
+    @property
+    def reconnects(self) -> int:
+        """Return the number of connections after the first one."""
+        return max(self.connects - 1, 0)
+
+    @property
+    def connected(self) -> bool:
+        """Return if the lamp is connected right now."""
+        return self._connected_since is not None
+
+    @property
+    def time_connected(self) -> float:
+        """Return the total seconds the lamp was connected."""
+        if self._connected_since is None:
+            return self._connected_time
+        return self._connected_time + time.monotonic() - self._connected_since
+
+    def on_connected(self) -> None:
+        """Record a new connection."""
+        self.connects += 1
+        if self._connected_since is None:
+            self._connected_since = time.monotonic()
+
+    def on_disconnected(self) -> None:
+        """Record the end of a connection."""
+        if self._connected_since is not None:
+            self._connected_time += time.monotonic() - self._connected_since
+            self._connected_since = None
+
+    def on_queued(self, depth: int) -> None:
+        """Record the queue depth after an item was queued."""
+        self.queue_depth = depth
+        self.queue_depth_histogram.observe(depth)
+
+    def on_written(self, size: int, waited: float, latency: float, depth: int) -> None:
+        """Record a completed write."""
+        self.commands_sent += 1
+        self.bytes_written += size
+        self.queue_depth = depth
+        self.queue_wait.observe(waited)
+        self.write_latency.observe(latency)
+
+    def as_dict(self) -> dict:
+        """Return all statistics as plain data."""
+        return {
+            "commands_sent": self.commands_sent,
+            "bytes_written": self.bytes_written,
+            "fragmented_payloads": self.fragmented_payloads,
+            "notifications_received": self.notifications_received,
+            "parse_failures": self.parse_failures,
+            "unknown_commands": self.unknown_commands,
+            "metrics_frames": self.metrics_frames,
+            "incomplete_frames": self.incomplete_frames,
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "connect_failures": self.connect_failures,
+            "connected": self.connected,
+            "time_connected": self.time_connected,
+            "queue_depth": self.queue_depth,
+            "queue_depth_histogram": self.queue_depth_histogram.as_dict(),
+            "queue_wait": self.queue_wait.as_dict(),
+            "write_latency": self.write_latency.as_dict(),
+        }
@@ -0,0 +1,141 @@
+"""Bounded asynchronous streams of parsed data points."""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Callable, Iterable
+
+from .handler import HeavnOneData
+
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_DROP_NEWEST = "drop_newest"
+OVERFLOW_COALESCE = "coalesce"
+OVERFLOW_POLICIES = (OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST, OVERFLOW_COALESCE)
+
+DEFAULT_STREAM_SIZE = 100
+
+
+class DataPointStream:
+    """Queue of data points of a single subscriber.
+
+    put() never blocks, so a slow subscriber cannot stall the notification
+    handler. When the queue is full the overflow policy decides what is lost:
+    drop_oldest discards the oldest item, drop_newest the new one and
+    coalesce keeps only the latest data point of every command. Every
+    discarded data point is counted in dropped.
+
+    Use it as an async iterator, it ends once the stream is closed:
+
+        async with device.stream({"qt"}) as stream:
+            async for dataPoint in stream:
+                ...
+    """
+
+    def __init__(
+        self,
+        commands: Iterable[str] | None = None,
+        maxsize: int = DEFAULT_STREAM_SIZE,
+        overflow: str = OVERFLOW_DROP_OLDEST,
+        on_close: Callable[[DataPointStream], None] | None = None,
+    ) -> None:
+        """Initialize the stream.
+
+        Args:
+            commands: command types to receive, None for all
+            maxsize: number of queued data points (or commands when coalescing)
+            overflow: one of OVERFLOW_POLICIES
+            on_close: called once when the stream is closed
+
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.commands = frozenset(commands) if commands is not None else None
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.dropped = 0
+        self.delivered = 0
+        self.closed = False
+        self._queue: deque[HeavnOneData] = deque()
+        self._latest: dict[str, HeavnOneData] = {}
+        self._ready = asyncio.Event()
+        self._on_close = on_close
+
+    def __len__(self) -> int:
+        return len(self._latest) if self.overflow == OVERFLOW_COALESCE else len(self._queue)
+
+    def put(self, dataPoint: HeavnOneData) -> None:
+        """Queue a data point if the subscriber asked for its command."""
+        if self.closed or (self.commands is not None and dataPoint.cmd not in self.commands):
+            return
+        if self.overflow == OVERFLOW_COALESCE:
+            if dataPoint.cmd in self._latest:
+                # replaced in place, the command keeps its position
+                self.dropped += 1
+            elif len(self._latest) >= self.maxsize:
+                del self._latest[next(iter(self._latest))]
+                self.dropped += 1
+            self._latest[dataPoint.cmd] = dataPoint
+        elif len(self._queue) < self.maxsize:
+            self._queue.append(dataPoint)
+        elif self.overflow == OVERFLOW_DROP_OLDEST:
+            self._queue.popleft()
+            self._queue.append(dataPoint)
+            self.dropped += 1
+        else:
+            self.dropped += 1
+            return
+        self._ready.set()
+
+    def _pop(self) -> HeavnOneData:
+        if self.overflow == OVERFLOW_COALESCE:
+            cmd = next(iter(self._latest))
+            return self._latest.pop(cmd)
+        return self._queue.popleft()
+
+    async def get(self) -> HeavnOneData:
+        """Return the next data point, waiting for it if necessary.
+
+        Raises:
+            StopAsyncIteration: the stream was closed and is drained
+        """
+        while not len(self):
+            if self.closed:
+                raise StopAsyncIteration
+            self._ready.clear()
+            await self._ready.wait()
+        self.delivered += 1
+        return self._pop()
+
+    def close(self) -> None:
+        """Stop receiving, the subscriber still gets what is queued."""
+        if self.closed:
+            return
+        self.closed = True
+        self._ready.set()
+        if self._on_close is not None:
+            self._on_close(self)
+
+    def __aiter__(self) -> DataPointStream:
+        return self
+
+    async def __anext__(self) -> HeavnOneData:
+        return await self.get()
+
+    async def __aenter__(self) -> DataPointStream:
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        self.close()
+
+    def as_dict(self) -> dict:
+        """Return the state of the stream as plain data."""
+        return {
+            "commands": sorted(self.commands) if self.commands is not None else None,
+            "maxsize": self.maxsize,
+            "overflow": self.overflow,
+            "queued": len(self),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
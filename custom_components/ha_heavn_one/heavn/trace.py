@@ -0,0 +1,103 @@
+"""Optional latency tracing from a queued write to the entity state write."""
+from __future__ import annotations
+
+from collections import deque
+import time
+
+from .stats import Histogram
+
+# upper bounds in seconds, parsing and dispatching take microseconds
+TRACE_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+# number of kept traces and the share of traces kept
+TRACE_SAMPLES = 100
+TRACE_SAMPLE_RATE = 10
+
+QUEUED = "queued"
+WRITE_STARTED = "write_started"
+WRITTEN = "written"
+RECEIVED = "received"
+PARSED = "parsed"
+DISPATCHED = "dispatched"
+STATE_WRITTEN = "state_written"
+
+# span name: (from stage, to stage)
+SPANS = {
+    "queue_wait": (QUEUED, WRITE_STARTED),
+    "write": (WRITE_STARTED, WRITTEN),
+    "parse": (RECEIVED, PARSED),
+    "dispatch": (PARSED, DISPATCHED),
+    "state_write": (DISPATCHED, STATE_WRITTEN),
+    "notify_total": (RECEIVED, STATE_WRITTEN),
+}
+
+
+class Tracer:
+    """Collect stage timestamps of writes and notifications of one lamp.
+
+    Notifications are handled synchronously, so the trace being built is
+    simply the current one: begin() opens it, mark() adds stages and end()
+    turns it into spans.
+    """
+
+    def __init__(self, address: str, sample_rate: int = TRACE_SAMPLE_RATE) -> None:
+        """Initialize the histograms of all spans."""
+        self.address = address
+        self.sample_rate = sample_rate
+        self.histograms = {span: Histogram(TRACE_BUCKETS) for span in SPANS}
+        self.traces: deque[dict] = deque(maxlen=TRACE_SAMPLES)
+        self.count = 0
+        self._current: dict[str, float] | None = None
+
+    def _record(self, cmd: str, stages: dict[str, float]) -> None:
+        spans = {}
+        for span, (start, end) in SPANS.items():
+            if start in stages and end in stages:
+                spans[span] = stages[end] - stages[start]
+                self.histograms[span].observe(spans[span])
+        self.count += 1
+        if self.count % self.sample_rate == 0:
+            self.traces.append({
+                "address": self.address,
+                "cmd": cmd,
+                "at": time.time(),
+                "spans": spans,
+            })
+
+    def on_written(self, data: bytes, queued: float, started: float, written: float) -> None:
+        """Record a completed write."""
+        cmd = data.decode("ascii", "replace")
+        self._record(cmd, {QUEUED: queued, WRITE_STARTED: started, WRITTEN: written})
+
+    def begin(self, received: float) -> None:
+        """Open the trace of a notification."""
+        self._current = {RECEIVED: received}
+
+    def mark(self, stage: str, first: bool = False) -> None:
+        """Add a stage to the current trace.
+
+        Args:
+            stage: stage name
+            first: keep the first time if the stage is reached repeatedly,
+                e.g. DISPATCHED for the readings of a metrics frame
+        """
+        if self._current is None:
+            return
+        if first:
+            self._current.setdefault(stage, time.monotonic())
+        else:
+            self._current[stage] = time.monotonic()
+
+    def end(self, cmd: str | None) -> None:
+        """Close the current trace."""
+        if self._current is not None and cmd is not None:
+            self._record(cmd, self._current)
+        self._current = None
+
+    def as_dict(self) -> dict:
+        """Return the histograms and the sampled traces as plain data."""
+        return {
+            "traced": self.count,
+            "sample_rate": self.sample_rate,
+            "spans": {span: histogram.as_dict() for span, histogram in self.histograms.items()},
+            "traces": list(self.traces),
+        }
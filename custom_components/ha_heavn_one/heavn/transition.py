@@ -0,0 +1,126 @@
+"""Client side fades between two manual side settings of a HEAVN One lamp."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+import logging
+import math
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .models import HeavnOneDevice
+
+_LOGGER = logging.getLogger(__name__)
+
+# frames per second sent while the link keeps up
+TARGET_FPS = 10
+# weight of a new write latency sample
+LATENCY_ALPHA = 0.3
+# seconds a frame may take to be written, including an on-demand connect
+FRAME_TIMEOUT = 30.0
+
+# (intensity, temperature)
+SideSetting = tuple[int, int]
+
+
+def interpolate(start: SideSetting, target: SideSetting, progress: float) -> SideSetting:
+    """Return the setting at the given progress (0..1) of a linear fade."""
+    progress = max(0.0, min(1.0, progress))
+    return (
+        round(start[0] + (target[0] - start[0]) * progress),
+        round(start[1] + (target[1] - start[1]) * progress),
+    )
+
+
+class TransitionEngine:
+    """Send fades frame by frame without ever queuing frames.
+
+    Each frame is written only after the previous one completed and is
+    computed for the time it is actually sent, so a slow link drops
+    intermediate frames instead of delaying the fade. The frame rate
+    follows the measured write latency. A frame not written within
+    FRAME_TIMEOUT seconds, e.g. after the lamp disconnected, aborts the
+    fade.
+    """
+
+    def __init__(self, device: HeavnOneDevice) -> None:
+        """Initialize the engine for a device."""
+        self._device = device
+        self._tasks: dict[int, asyncio.Task] = {}
+        self.latency: float | None = None
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        # builds the payload of a frame, can be replaced e.g. by channel level frames
+        self.frame_func: Callable[[int, int, int], bytes] = device.handler.reqManualSide
+
+    @property
+    def frame_interval(self) -> float:
+        """Return the seconds between two frames."""
+        minimum = 1 / TARGET_FPS
+        if self.latency is None:
+            return minimum
+        return max(minimum, self.latency)
+
+    def start(self, side: int, start: SideSetting, target: SideSetting, duration: float) -> asyncio.Task:
+        """Start a fade of a side, a running fade of that side is cancelled."""
+        self.cancel(side)
+        task = asyncio.create_task(self._run(side, start, target, duration))
+        self._tasks[side] = task
+
+        def _done(_: asyncio.Task) -> None:
+            if self._tasks.get(side) is task:
+                del self._tasks[side]
+            if not task.cancelled() and (ex := task.exception()) is not None:
+                _LOGGER.warning(
+                    "(%s) Fade of side %d aborted: %s", self._device.address, side, repr(ex)
+                )
+
+        task.add_done_callback(_done)
+        return task
+
+    def active(self, side: int) -> bool:
+        """Return if a side is fading right now."""
+        return side in self._tasks
+
+    def cancel(self, side: int) -> None:
+        """Cancel a running fade of a side."""
+        if (task := self._tasks.pop(side, None)) is not None:
+            task.cancel()
+
+    async def _send(self, side: int, setting: SideSetting) -> None:
+        loop = asyncio.get_running_loop()
+        startedAt = loop.time()
+        await asyncio.wait_for(self._device.write(self.frame_func(side, *setting)), FRAME_TIMEOUT)
+        self._device.record_manual_side(side, *setting)
+        latency = loop.time() - startedAt
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += LATENCY_ALPHA * (latency - self.latency)
+        self.frames_sent += 1
+
+    async def _run(self, side: int, start: SideSetting, target: SideSetting, duration: float) -> None:
+        loop = asyncio.get_running_loop()
+        begin = loop.time()
+        end = begin + duration
+        planned = max(1, math.floor(duration * TARGET_FPS))
+        sent = 0
+        while duration > 0:
+            now = loop.time()
+            # leave room for the final frame so the fade ends on time
+            if end - now < self.frame_interval + (self.latency or 0):
+                break
+            await self._send(side, interpolate(start, target, (now - begin) / duration))
+            sent += 1
+            nextFrame = min(now + self.frame_interval, end)
+            await asyncio.sleep(max(0.0, nextFrame - loop.time()))
+
+        # send the target so it arrives at the end of the fade
+        remaining = end - (self.latency or 0) - loop.time()
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+        await self._send(side, target)
+        self.frames_dropped += max(0, planned - sent - 1)
+        _LOGGER.debug(
+            "Fade of side %d done: %d frames, %.0fms latency", side, sent + 1, (self.latency or 0) * 1000
+        )
@@ -0,0 +1,192 @@
+"""Support for the sides of a HEAVN One lamp as lights."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import logging
+from typing import Any
+
+from homeassistant import config_entries
+from homeassistant.components.light import (
+    ATTR_BRIGHTNESS,
+    ATTR_COLOR_TEMP_KELVIN,
+    ATTR_TRANSITION,
+    ColorMode,
+    LightEntity,
+    LightEntityDescription,
+    LightEntityFeature,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DOMAIN
+from .entity import HeavnOneEntity
+from .heavn import HeavnOneDevice, HeavnOneProtocolHandler
+from .heavn.handler import HeavnOneData
+
+_LOGGER = logging.getLogger(__name__)
+
+# the lamp takes the colour temperature in hundreds of kelvin
+TEMPERATURE_SCALE = 100
+MIN_COLOR_TEMP_KELVIN = 1500
+MAX_COLOR_TEMP_KELVIN = 6500
+DEFAULT_TEMPERATURE = 40
+
+
+@dataclass(frozen=True, kw_only=True)
+class HeavnOneLightEntityDescription(LightEntityDescription):
+    """Entity description of a lamp side."""
+
+    side: int
+
+
+LIGHTS: tuple[HeavnOneLightEntityDescription, ...] = tuple(
+    HeavnOneLightEntityDescription(
+        key=f"light_{sideName}",
+        side=side,
+        name=sideName.capitalize(),
+    )
+    for side, sideName in enumerate(HeavnOneProtocolHandler.SIDES)
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: config_entries.ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+
+    device: HeavnOneDevice = hass.data[DOMAIN][entry.entry_id]
+    # the sides are driven in manual mode
+    if not device.capabilities.is_supported(HeavnOneProtocolHandler.GET_MANUAL_MODE_ENABLED):
+        _LOGGER.info(f"Device {device.address} does not support manual mode")
+        return
+    _LOGGER.info(f"Setup light sides for device {device.address}")
+    async_add_entities(
+        HeavnOneLightEntity(device, entry, description) for description in LIGHTS
+    )
+
+
+class HeavnOneLightEntity(HeavnOneEntity, LightEntity):
+    """Representation of a lamp side in manual mode."""
+
+    entity_description: HeavnOneLightEntityDescription
+    _attr_color_mode = ColorMode.COLOR_TEMP
+    _attr_supported_color_modes = {ColorMode.COLOR_TEMP}
+    _attr_supported_features = LightEntityFeature.TRANSITION
+    _attr_min_color_temp_kelvin = MIN_COLOR_TEMP_KELVIN
+    _attr_max_color_temp_kelvin = MAX_COLOR_TEMP_KELVIN
+
+    def __init__(
+        self,
+        device: HeavnOneDevice,
+        entry: ConfigEntry,
+        entity_description: HeavnOneLightEntityDescription,
+    ) -> None:
+        """Initialize the light entity."""
+        super().__init__(
+            device, entry, entity_description, unique_id_suffix=entity_description.key
+        )
+        self._intensity = 0
+        self._last_intensity = 100
+        self._temperature = DEFAULT_TEMPERATURE
+
+    @property
+    def is_on(self) -> bool:
+        return self._intensity > 0
+
+    @property
+    def brightness(self) -> int:
+        return round(self._intensity * 255 / 100)
+
+    @property
+    def color_temp_kelvin(self) -> int:
+        return self._temperature * TEMPERATURE_SCALE
+
+    async def async_added_to_hass(self) -> None:
+        """Follow the side states and intensities pushed by the lamp."""
+        side = self.entity_description.side
+
+        @callback
+        def async_buttons(value: HeavnOneData) -> None:
+            """Update on/off when a side is switched on the lamp."""
+            enabled = value.dataValue[side]
+            if enabled == self.is_on:
+                return
+            if enabled:
+                self._intensity = self._last_intensity
+            else:
+                self._last_intensity = self._intensity
+                self._intensity = 0
+            self.async_write_ha_state()
+
+        @callback
+        def async_intensity(value: HeavnOneData) -> None:
+            """Update the brightness, unless a fade of this side is running."""
+            intensity = value.dataValue[side]
+            if self.device.transitions.active(side) or intensity == self._intensity:
+                return
+            if self._intensity:
+                self._last_intensity = self._intensity
+            self._intensity = intensity
+            self.async_write_ha_state()
+
+        self.async_on_remove(
+            self.device.register_sensor_callback(
+                HeavnOneProtocolHandler.GET_TOP_MID_BOT, async_buttons
+            )
+        )
+        @callback
+        def async_manual_side(value: HeavnOneData) -> None:
+            """Follow settings written by others, e.g. daylight harvesting."""
+            intensity, temperature = value.dataValue
+            if self.device.transitions.active(side) or (
+                (intensity, temperature) == (self._intensity, self._temperature)
+            ):
+                return
+            if self._intensity:
+                self._last_intensity = self._intensity
+            self._intensity = intensity
+            self._temperature = temperature
+            self.async_write_ha_state()
+
+        self.async_on_remove(
+            self.device.register_sensor_callback(
+                HeavnOneProtocolHandler.SET_INTENSITY, async_intensity
+            )
+        )
+        self.async_on_remove(
+            self.device.register_sensor_callback(
+                HeavnOneProtocolHandler.manualSideCommand(side), async_manual_side
+            )
+        )
+
+    async def async_turn_on(self, **kwargs: Any) -> None:
+        """Turn the side on, fading if a transition is given."""
+        intensity = self._last_intensity
+        if ATTR_BRIGHTNESS in kwargs:
+            intensity = max(1, round(kwargs[ATTR_BRIGHTNESS] * 100 / 255))
+        temperature = self._temperature
+        if ATTR_COLOR_TEMP_KELVIN in kwargs:
+            temperature = round(kwargs[ATTR_COLOR_TEMP_KELVIN] / TEMPERATURE_SCALE)
+        self._fade(intensity, temperature, kwargs.get(ATTR_TRANSITION, 0))
+
+    async def async_turn_off(self, **kwargs: Any) -> None:
+        """Turn the side off, fading if a transition is given."""
+        self._fade(0, self._temperature, kwargs.get(ATTR_TRANSITION, 0))
+
+    def _fade(self, intensity: int, temperature: int, transition: float) -> None:
+        """Start the fade and show the target state right away."""
+        start = (self._intensity, self._temperature)
+        if self._intensity:
+            self._last_intensity = self._intensity
+        self._intensity = intensity
+        self._temperature = temperature
+        self.async_write_ha_state()
+
+        # manual side settings only apply in manual mode
+        self.device.queue_send(self.device.handler.reqSetManualMode(True))
+        self.device.transitions.start(
+            self.entity_description.side, start, (intensity, temperature), transition
+        )
@@ -4,6 +4,7 @@ from __future__ import annotations
 
 from collections.abc import Callable
 from dataclasses import dataclass
+import datetime
 import logging
 
 from homeassistant import config_entries
@@ -11,14 +12,18 @@ from homeassistant.components.sensor import (
     SensorDeviceClass,
     SensorEntity,
     SensorEntityDescription,
+    SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
     CONCENTRATION_PARTS_PER_MILLION,
     CONF_ADDRESS,
     PERCENTAGE,
+    EntityCategory,
+    UnitOfInformation,
     UnitOfPressure,
     UnitOfTemperature,
+    UnitOfTime,
 )
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
@@ -27,6 +32,8 @@ from homeassistant.helpers.typing import StateType
 from .const import DOMAIN
 from .entity import HeavnOneEntity, HeavnOneSwitchEntity
 from .heavn import HeavnOneDevice, HeavnOneProtocolHandler
+from .heavn.solar import SolarDay
+from .heavn.stats import HeavnOneStatistics
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -90,6 +97,152 @@ SENSORS: tuple[HeavnOneSensorEntityDescription, ...] = (
         register_callback_func=lambda device: device.register_sensor_callback,
         name="CO2 Accuracy",
     ),
+    HeavnOneSensorEntityDescription[float](
+        key="ambient_light",
+        command_type=HeavnOneProtocolHandler.GET_LIGHT_SENSOR,
+        device_class=None,
+        native_unit_of_measurement=None,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_func=lambda value: value.dataValue,
+        register_callback_func=lambda device: device.register_sensor_callback,
+        name="Ambient Light",
+    ),
+)
+
+CHANNEL_SENSORS: tuple[HeavnOneSensorEntityDescription, ...] = tuple(
+    HeavnOneSensorEntityDescription[int](
+        key=f"channel_{channel}",
+        command_type=HeavnOneProtocolHandler.channelCommand(channel),
+        device_class=None,
+        native_unit_of_measurement=None,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_func=lambda value: value.dataValue,
+        register_callback_func=lambda device: device.register_sensor_callback,
+        name=f"LED {channelName}",
+    )
+    for channel, channelName in enumerate(HeavnOneProtocolHandler.CHANNEL_NAMES)
+)
+
+
+@dataclass(frozen=True, kw_only=True)
+class HeavnOneStatisticsSensorEntityDescription(SensorEntityDescription):
+    """Entity description of a sensor reading the transport statistics."""
+
+    value_func: Callable[[HeavnOneStatistics], StateType]
+    entity_category: EntityCategory | None = EntityCategory.DIAGNOSTIC
+    entity_registry_enabled_default: bool = False
+
+
+def _milliseconds(value: float | None) -> float | None:
+    return None if value is None else round(value * 1000, 1)
+
+
+STATISTICS_SENSORS: tuple[HeavnOneStatisticsSensorEntityDescription, ...] = (
+    HeavnOneStatisticsSensorEntityDescription(
+        key="commands_sent",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_func=lambda stats: stats.commands_sent,
+        name="Commands sent",
+    ),
+    HeavnOneStatisticsSensorEntityDescription(
+        key="bytes_written",
+        device_class=SensorDeviceClass.DATA_SIZE,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_func=lambda stats: stats.bytes_written,
+        name="Bytes written",
+    ),
+    HeavnOneStatisticsSensorEntityDescription(
+        key="notifications_received",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_func=lambda stats: stats.notifications_received,
+        name="Notifications received",
+    ),
+    HeavnOneStatisticsSensorEntityDescription(
+        key="parse_failures",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_func=lambda stats: stats.parse_failures,
+        name="Parse failures",
+    ),
+    HeavnOneStatisticsSensorEntityDescription(
+        key="unknown_commands",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_func=lambda stats: stats.unknown_commands,
+        name="Unknown commands",
+    ),
+    HeavnOneStatisticsSensorEntityDescription(
+        key="reconnects",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_func=lambda stats: stats.reconnects,
+        name="Reconnects",
+    ),
+    HeavnOneStatisticsSensorEntityDescription(
+        key="queue_depth",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_func=lambda stats: stats.queue_depth,
+        name="Queue depth",
+    ),
+    HeavnOneStatisticsSensorEntityDescription(
+        key="queue_wait",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_func=lambda stats: _milliseconds(stats.queue_wait.mean),
+        name="Queue wait time",
+    ),
+    HeavnOneStatisticsSensorEntityDescription(
+        key="write_latency",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_func=lambda stats: _milliseconds(stats.write_latency.mean),
+        name="Write latency",
+    ),
+    HeavnOneStatisticsSensorEntityDescription(
+        key="time_connected",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_func=lambda stats: round(stats.time_connected),
+        name="Time connected",
+    ),
+)
+
+
+@dataclass(frozen=True, kw_only=True)
+class HeavnOneSolarSensorEntityDescription(SensorEntityDescription):
+    """Entity description of a sensor computed from the lamp location."""
+
+    value_func: Callable[[SolarDay, datetime.datetime], StateType | datetime.datetime]
+
+
+SOLAR_SENSORS: tuple[HeavnOneSolarSensorEntityDescription, ...] = (
+    HeavnOneSolarSensorEntityDescription(
+        key="sunrise",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        value_func=lambda day, now: day.sunrise,
+        name="Sunrise",
+    ),
+    HeavnOneSolarSensorEntityDescription(
+        key="sunset",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        value_func=lambda day, now: day.sunset,
+        name="Sunset",
+    ),
+    # the integration's model of a circadian curve, not read from the lamp
+    HeavnOneSolarSensorEntityDescription(
+        key="circadian_intensity",
+        native_unit_of_measurement=PERCENTAGE,
+        value_func=lambda day, now: day.at(now).intensity,
+        name="Modelled circadian intensity",
+    ),
+    HeavnOneSolarSensorEntityDescription(
+        key="circadian_temperature",
+        native_unit_of_measurement="K",
+        value_func=lambda day, now: day.at(now).temperature * 100,
+        name="Modelled circadian colour temperature",
+    ),
 )
 
 
@@ -103,9 +256,18 @@ async def async_setup_entry(
     _LOGGER.info(f"Setup sensor values for device {device.address}")
     entities: list[SensorEntity] = [
         HeavnOneSensorEntity(device, entry, description)
-        for description in SENSORS
+        for description in (*SENSORS, *CHANNEL_SENSORS)
         if description.is_supported(device)
+        and device.capabilities.is_supported(description.command_type)
     ]
+    entities.extend(
+        HeavnOneStatisticsSensorEntity(device, entry, description)
+        for description in STATISTICS_SENSORS
+    )
+    entities.extend(
+        HeavnOneSolarSensorEntity(device, entry, description)
+        for description in SOLAR_SENSORS
+    )
     async_add_entities(entities)
 
 
@@ -137,8 +299,58 @@ class HeavnOneSensorEntity[_T](HeavnOneEntity, SensorEntity):
         def async_callback(value: _T | None) -> None:
             """Update the sensor value."""
             self._attr_native_value = self.entity_description.value_func(value)
+            if value.attributes is not None:
+                self._attr_extra_state_attributes = value.attributes
             self.async_write_ha_state()
 
-        self.entity_description.register_callback_func(self.device)(
-            self.entity_description.command_type, async_callback
+        self.async_on_remove(
+            self.entity_description.register_callback_func(self.device)(
+                self.entity_description.command_type, async_callback
+            )
         )
+
+
+class HeavnOneStatisticsSensorEntity(HeavnOneEntity, SensorEntity):
+    """Representation of a polled transport statistics sensor."""
+
+    entity_description: HeavnOneStatisticsSensorEntityDescription
+    _attr_should_poll = True
+
+    def __init__(
+        self,
+        device: HeavnOneDevice,
+        entry: ConfigEntry,
+        entity_description: HeavnOneStatisticsSensorEntityDescription,
+    ) -> None:
+        """Initialize the statistics sensor entity."""
+        super().__init__(
+            device, entry, entity_description, unique_id_suffix=entity_description.key
+        )
+
+    async def async_update(self) -> None:
+        """Read the statistics, this does not cause any BLE traffic."""
+        self._attr_native_value = self.entity_description.value_func(self.device.stats)
+
+
+class HeavnOneSolarSensorEntity(HeavnOneEntity, SensorEntity):
+    """Representation of a sensor computed locally from the lamp location."""
+
+    entity_description: HeavnOneSolarSensorEntityDescription
+    _attr_should_poll = True
+
+    def __init__(
+        self,
+        device: HeavnOneDevice,
+        entry: ConfigEntry,
+        entity_description: HeavnOneSolarSensorEntityDescription,
+    ) -> None:
+        """Initialize the solar sensor entity."""
+        super().__init__(
+            device, entry, entity_description, unique_id_suffix=entity_description.key
+        )
+
+    async def async_update(self) -> None:
+        """Look the value up in the precomputed table of the day."""
+        now = datetime.datetime.now(datetime.UTC)
+        day = self.device.solar_day(now)
+        self._attr_native_value = None if day is None else self.entity_description.value_func(day, now)
@@ -0,0 +1,250 @@
+"""Services of the HEAVN One integration."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+
+import voluptuous as vol
+
+from homeassistant.const import (
+    ATTR_DEVICE_ID,
+    ATTR_LATITUDE,
+    ATTR_LONGITUDE,
+    ATTR_NAME,
+)
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv, device_registry as dr
+
+from .const import DOMAIN
+from .heavn import HeavnOneDevice, HeavnOneProtocolHandler
+from .heavn.bulk import DEFAULT_CONCURRENCY, DEFAULT_TIMEOUT, build_payload, run_bulk
+from .heavn.capture import read_capture, replay_detached
+from .heavn.config import CONFIG_KEYS
+from .heavn.presets import Preset
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_APPLY_PRESET = "apply_preset"
+SERVICE_BULK_APPLY = "bulk_apply"
+SERVICE_PROBE_CAPABILITIES = "probe_capabilities"
+SERVICE_RECONCILE_CONFIG = "reconcile_config"
+SERVICE_REPLAY_CAPTURE = "replay_capture"
+
+ATTR_CONCURRENCY = "concurrency"
+ATTR_OPERATIONS = "operations"
+ATTR_PATH = "path"
+ATTR_TIMEOUT = "timeout"
+
+INTENSITY = vol.All(vol.Coerce(int), vol.Range(min=0, max=100))
+TEMPERATURE = vol.All(vol.Coerce(int), vol.Range(min=0, max=999))
+# printable ASCII without the command prefix, which would split the command
+NAME = vol.Match(r"^[\x20-\x3f\x41-\x7e]*$", msg="Names must be ASCII without @")
+
+# writing services name their lamps, a missing target must not mean the fleet
+TARGET = vol.All(cv.ensure_list, vol.Length(min=1), [cv.string])
+
+APPLY_PRESET_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_DEVICE_ID): TARGET,
+        vol.Optional(ATTR_NAME): vol.All(cv.string, vol.Length(max=10), NAME),
+        **{
+            vol.Optional(side): vol.Schema(
+                {
+                    vol.Required("intensity"): INTENSITY,
+                    vol.Required("temperature"): TEMPERATURE,
+                }
+            )
+            for side in HeavnOneProtocolHandler.SIDES
+        },
+    }
+)
+
+# an operation is a handler request name, optionally followed by arguments
+OPERATION = vol.All(cv.ensure_list, vol.Length(min=1), [cv.match_all])
+
+BULK_APPLY_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_DEVICE_ID): TARGET,
+        vol.Required(ATTR_OPERATIONS): vol.All(cv.ensure_list, vol.Length(min=1), [OPERATION]),
+        vol.Optional(ATTR_CONCURRENCY, default=DEFAULT_CONCURRENCY): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=16)
+        ),
+        vol.Optional(ATTR_TIMEOUT, default=DEFAULT_TIMEOUT): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=300)
+        ),
+    }
+)
+
+RECONCILE_CONFIG_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Required(ATTR_DEVICE_ID): TARGET,
+            vol.Optional(ATTR_NAME): vol.All(cv.string, vol.Length(min=1, max=HeavnOneProtocolHandler.NAME_MAX_LENGTH), NAME),
+            vol.Optional(ATTR_LATITUDE): cv.latitude,
+            vol.Optional(ATTR_LONGITUDE): cv.longitude,
+            vol.Optional("presence"): cv.boolean,
+            vol.Optional("presence_timeout"): vol.All(vol.Coerce(int), vol.Range(min=0, max=86400)),
+            vol.Optional("air_quality_led"): cv.boolean,
+            vol.Optional("gesture_sensors"): cv.boolean,
+            vol.Optional("bluetooth_auto_off"): cv.boolean,
+            vol.Optional("coworking_mode"): cv.boolean,
+            vol.Optional("coworking_default_intensity"): INTENSITY,
+        }
+    ),
+    cv.has_at_least_one_key(*CONFIG_KEYS),
+)
+
+PROBE_CAPABILITIES_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_DEVICE_ID): vol.All(cv.ensure_list, [cv.string]),
+    }
+)
+
+REPLAY_CAPTURE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_PATH): cv.string,
+    }
+)
+
+
+def async_get_devices(
+    hass: HomeAssistant, call: ServiceCall
+) -> dict[str, HeavnOneDevice]:
+    """Return the lamps targeted by a service call, all lamps if none is given."""
+    devices: dict[str, HeavnOneDevice] = hass.data.get(DOMAIN, {})
+    if ATTR_DEVICE_ID not in call.data:
+        return dict(devices)
+
+    registry = dr.async_get(hass)
+    targets: dict[str, HeavnOneDevice] = {}
+    for device_id in call.data[ATTR_DEVICE_ID]:
+        if (device_entry := registry.async_get(device_id)) is None:
+            continue
+        for entry_id in device_entry.config_entries:
+            if entry_id in devices:
+                targets[entry_id] = devices[entry_id]
+    return targets
+
+
+async def _async_apply_preset(call: ServiceCall) -> ServiceResponse:
+    """Write the desired preset to every targeted lamp, only where it differs."""
+    desired = Preset(
+        name=call.data.get(ATTR_NAME),
+        sides=[
+            (call.data[side]["intensity"], call.data[side]["temperature"])
+            if side in call.data
+            else None
+            for side in HeavnOneProtocolHandler.SIDES
+        ],
+    )
+    results = {}
+    for device in async_get_devices(call.hass, call).values():
+        changed = await device.sync_preset(desired)
+        results[device.address] = {
+            "changed": changed,
+            "preset": device.presets.current.as_dict(),
+        }
+    return {"lamps": results}
+
+
+async def _async_bulk_apply(call: ServiceCall) -> ServiceResponse:
+    """Write chained operations to the targeted lamps with bounded concurrency."""
+    try:
+        payload = build_payload(HeavnOneProtocolHandler(), call.data[ATTR_OPERATIONS])
+    except ValueError as err:
+        raise ServiceValidationError(str(err)) from err
+
+    results = await run_bulk(
+        async_get_devices(call.hass, call).values(),
+        payload,
+        call.data[ATTR_CONCURRENCY],
+        call.data[ATTR_TIMEOUT],
+    )
+    return {"lamps": results}
+
+
+async def _async_probe_capabilities(call: ServiceCall) -> ServiceResponse:
+    """Probe the targeted lamps again and replace their cached capabilities."""
+    results = {}
+    for device in async_get_devices(call.hass, call).values():
+        # the device stores the result through capabilities_changed
+        await device.discover_capabilities(force=True)
+        results[device.address] = device.capabilities.as_dict()
+    return {"lamps": results}
+
+
+async def _async_reconcile_config(call: ServiceCall) -> ServiceResponse:
+    """Bring the settings of the targeted lamps to the desired values."""
+    desired = {key: call.data[key] for key in CONFIG_KEYS if key in call.data}
+    semaphore = asyncio.Semaphore(DEFAULT_CONCURRENCY)
+
+    async def reconcile(device: HeavnOneDevice) -> dict:
+        async with semaphore:
+            result = await device.reconcile_config(desired)
+        return {
+            **result,
+            "config": {key: device.config.current.get(key) for key in desired},
+        }
+
+    devices = list(async_get_devices(call.hass, call).values())
+    results = await asyncio.gather(*(reconcile(device) for device in devices))
+    return {"lamps": {device.address: result for device, result in zip(devices, results)}}
+
+
+async def _async_replay_capture(call: ServiceCall) -> ServiceResponse:
+    """Parse a capture file without touching the lamps and return the result."""
+    path = call.data[ATTR_PATH]
+    if not call.hass.config.is_allowed_path(path):
+        raise ServiceValidationError(f"Access to {path} is not allowed")
+
+    try:
+        records = await call.hass.async_add_executor_job(lambda: list(read_capture(path)))
+    except (OSError, ValueError) as err:
+        raise ServiceValidationError(f"Cannot replay {path}: {err}") from err
+    return await replay_detached(records)
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services of the integration."""
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_APPLY_PRESET,
+        _async_apply_preset,
+        schema=APPLY_PRESET_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BULK_APPLY,
+        _async_bulk_apply,
+        schema=BULK_APPLY_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROBE_CAPABILITIES,
+        _async_probe_capabilities,
+        schema=PROBE_CAPABILITIES_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_RECONCILE_CONFIG,
+        _async_reconcile_config,
+        schema=RECONCILE_CONFIG_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_REPLAY_CAPTURE,
+        _async_replay_capture,
+        schema=REPLAY_CAPTURE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
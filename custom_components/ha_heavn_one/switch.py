@@ -29,9 +29,45 @@ class HeavnOneSwitchEntityDescription[_T](SwitchEntityDescription):
         [HeavnOneDevice], Callable[[Callable[[_T | None], None]], None]
     ]
     value_func: Callable[[_T | None], StateType]
+    get_func: Callable[[HeavnOneProtocolHandler], bytes]
+    set_func: Callable[[HeavnOneProtocolHandler, bool], bytes] | None = None
     is_supported: Callable[[HeavnOneDevice], bool] = lambda device: True
 
 
+SWITCHES: tuple[HeavnOneSwitchEntityDescription, ...] = (
+    HeavnOneSwitchEntityDescription[bool](
+        key="manual_mode",
+        command_type=HeavnOneProtocolHandler.GET_MANUAL_MODE_ENABLED,
+        device_class=None,
+        value_func=lambda value: value.dataValue,
+        get_func=lambda handler: handler.reqGetManualModeState(),
+        set_func=lambda handler, state: handler.reqSetManualMode(state),
+        register_callback_func=lambda device: device.register_sensor_callback,
+        name="ManualMode",
+    ),
+    HeavnOneSwitchEntityDescription[bool](
+        key="air_quality_led",
+        command_type=HeavnOneProtocolHandler.GET_AIR_QUALITY_LED_ENABLED,
+        device_class=None,
+        value_func=lambda value: value.dataValue == 1,
+        get_func=lambda handler: handler.reqAirQualityLED(),
+        set_func=lambda handler, state: handler.reqSetAirQualityLED(state),
+        register_callback_func=lambda device: device.register_sensor_callback,
+        name="Air Quality LED",
+    ),
+    HeavnOneSwitchEntityDescription[bool](
+        key="bluetooth_auto_off",
+        command_type=HeavnOneProtocolHandler.GET_BLUETOOTH_AUTO_OFF_ENABLED,
+        device_class=None,
+        value_func=lambda value: value.dataValue,
+        get_func=lambda handler: handler.reqBluetoothAutoOff(),
+        set_func=lambda handler, state: handler.reqSetBluetoothAutoOff(state),
+        register_callback_func=lambda device: device.register_sensor_callback,
+        name="Bluetooth Auto Off",
+    ),
+)
+
+
 async def async_setup_entry(
     hass: HomeAssistant,
     entry: config_entries.ConfigEntry,
@@ -40,20 +76,10 @@ async def async_setup_entry(
 
     device: HeavnOneDevice = hass.data[DOMAIN][entry.entry_id]
     _LOGGER.info(f"Setup sensor values for device {device.address}")
-    entities: list[SwitchEntity] = []
-    entities.append(
-        HeavnOneSwitchEntity(
-            device,
-            entry,
-            HeavnOneSwitchEntityDescription[bool](
-                key="manual_mode",
-                command_type=HeavnOneProtocolHandler.GET_MANUAL_MODE_ENABLED,
-                device_class=None,
-                value_func=lambda value: value.dataValue,
-                register_callback_func=lambda device: device.register_sensor_callback,
-                name="ManualMode",
-            ),
-        )
-    )
+    entities: list[SwitchEntity] = [
+        HeavnOneSwitchEntity(device, entry, description)
+        for description in SWITCHES
+        if description.is_supported(device)
+        and device.capabilities.is_supported(description.command_type)
+    ]
     async_add_entities(entities)
-
@@ -0,0 +1,34 @@
+"""HTTP view serving the readings of all lamps in OpenMetrics format."""
+
+from __future__ import annotations
+
+from aiohttp import web
+
+from homeassistant.components.http import KEY_HASS, HomeAssistantView
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN
+from .heavn import HeavnOneDevice
+from .heavn.openmetrics import CONTENT_TYPE, render
+
+
+class HeavnOneMetricsView(HomeAssistantView):
+    """Expose readings, link statistics and queue state of every lamp."""
+
+    url = f"/api/{DOMAIN}/metrics"
+    name = f"api:{DOMAIN}:metrics"
+
+    async def get(self, request: web.Request) -> web.Response:
+        """Render the metrics from memory, without the state machine."""
+        hass: HomeAssistant = request.app[KEY_HASS]
+        devices: dict[str, HeavnOneDevice] = hass.data.get(DOMAIN, {})
+        return web.Response(
+            body=render(devices.values()).encode("utf-8"),
+            headers={"Content-Type": CONTENT_TYPE},
+        )
+
+
+@callback
+def async_register_view(hass: HomeAssistant) -> None:
+    """Register the metrics view."""
+    hass.http.register_view(HeavnOneMetricsView())